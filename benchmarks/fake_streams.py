@@ -0,0 +1,96 @@
+import asyncio
+import json
+from typing import Dict
+from urllib.parse import parse_qs, urlparse
+import websockets
+from benchmarks.fake_upstreams import FakeUpstreams
+
+# INFO: Local stand-ins for the Binance and Kraken websocket ticker feeds, served by one websocket server on
+# /binance/stream (combined streams, the symbols in the URL) and /kraken (subscribe message).
+# INFO: The quotes come from the random walk of the fake REST upstreams, so the streamed and the polled prices agree.
+# Every subscribed asset gets a tick each interval, in the message format of the real feed.
+
+
+class FakeTickerStreams:
+    def __init__(self, upstreams: FakeUpstreams, interval: float = 0.2):
+        self.upstreams = upstreams
+        self.interval = interval
+        self.connections = {exchange: 0 for exchange in ("binance", "kraken")}
+        self.messages = {exchange: 0 for exchange in self.connections}
+        self.server: websockets.WebSocketServer | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8902):
+        self.server = await websockets.serve(self.handle, host, port)
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"connections": dict(self.connections), "messages": dict(self.messages)}
+
+    async def handle(self, websocket):
+        url = urlparse(websocket.path)
+        try:
+            if url.path == "/binance/stream":
+                await self.binance(websocket, parse_qs(url.query).get("streams", [""])[0])
+            elif url.path == "/kraken":
+                await self.kraken(websocket)
+            else:
+                await websocket.close(1008, f"Unsupported path: {url.path}")
+        except websockets.ConnectionClosed:
+            pass
+
+    # INFO: Combined stream messages, {"stream": "btcusdt@ticker", "data": {<24hr ticker event>}}.
+    async def binance(self, websocket, streams: str):
+        self.connections["binance"] += 1
+        symbols = [stream.split("@")[0].upper() for stream in streams.split("/") if stream]
+        assets = {symbol: symbol[:-len("USDT")] for symbol in symbols}
+        assets = {symbol: asset for symbol, asset in assets.items() if asset in self.upstreams.binance_assets}
+        while True:
+            for symbol, asset in assets.items():
+                quote = self.upstreams._quote(asset)
+                await websocket.send(json.dumps({
+                    "stream": f"{symbol.lower()}@ticker",
+                    "data": {
+                        "e": "24hrTicker",
+                        "s": symbol,
+                        "a": str(quote["ask"]),
+                        "b": str(quote["bid"]),
+                        "c": str(quote["spot"]),
+                        "P": str(quote["change"])
+                    }
+                }))
+                self.messages["binance"] += 1
+            await asyncio.sleep(self.interval)
+
+    # INFO: Ticker messages are arrays, [channel_id, {"a", "b", "c", "o"}, "ticker", "BTC/USD"].
+    async def kraken(self, websocket):
+        self.connections["kraken"] += 1
+        subscribe = json.loads(await websocket.recv())
+        pairs = [pair for pair in subscribe.get("pair", []) if pair[:-len("/USD")] in self.upstreams.kraken_assets]
+        for channel_id, pair in enumerate(pairs):
+            await websocket.send(json.dumps({
+                "event": "subscriptionStatus",
+                "channelID": channel_id,
+                "pair": pair,
+                "status": "subscribed",
+                "subscription": {"name": "ticker"}
+            }))
+        while True:
+            for channel_id, pair in enumerate(pairs):
+                quote = self.upstreams._quote(pair[:-len("/USD")])
+                await websocket.send(json.dumps([
+                    channel_id,
+                    {
+                        "a": [str(quote["ask"]), 1, "1.000"],
+                        "b": [str(quote["bid"]), 1, "1.000"],
+                        "c": [str(quote["spot"]), "0.1"],
+                        "o": [str(quote["spot"] / (1 + quote["change"] / 100)), str(quote["spot"])]
+                    },
+                    "ticker",
+                    pair
+                ]))
+                self.messages["kraken"] += 1
+            await asyncio.sleep(self.interval)
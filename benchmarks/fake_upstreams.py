@@ -0,0 +1,136 @@
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List
+from aiohttp import web
+from src.config.constants import SUPPORTED_ASSETS
+from src.utils.currency_conversion import FX_PAIRS
+
+# INFO: Local stand-ins for the Newton, Binance and Kraken (rates and FX) endpoints, served by one aiohttp app.
+# INFO: Each provider has its own injected latency (plus jitter) and error rate, an error is a 500 response.
+# INFO: The first newton_assets assets are served by Newton, the unsupported ones by nobody, the rest are split
+# between Binance and Kraken like the real routes. Prices follow a small random walk on every request.
+# INFO: Newton sends the malformed_assets with an ask that is not a number, to exercise the quarantine of bad quotes.
+FX_RATES = {"CAD": 1.36, "EUR": 0.92, "GBP": 0.79, "JPY": 150.0, "CHF": 0.9, "AUD": 1.52}
+
+
+class FakeUpstreams:
+    def __init__(
+        self,
+        latency: Dict[str, float] | None = None,
+        error_rate: Dict[str, float] | None = None,
+        jitter: float = 0.0,
+        newton_assets: int = 60,
+        unsupported_assets: List[str] | None = None,
+        malformed_assets: List[str] | None = None
+    ):
+        self.latency = latency or {}
+        self.error_rate = error_rate or {}
+        self.jitter = jitter
+        self.malformed = set(malformed_assets or [])
+        self.unsupported = set(unsupported_assets if unsupported_assets is not None else ["QCAD"])
+        self.newton_assets = [asset for asset in SUPPORTED_ASSETS[:newton_assets] if asset not in self.unsupported]
+        remaining = [asset for asset in SUPPORTED_ASSETS[newton_assets:] if asset not in self.unsupported]
+        self.binance_assets = set(remaining[::2])
+        self.kraken_assets = set(remaining[1::2])
+        self.prices = {asset: random.uniform(0.01, 90000) for asset in SUPPORTED_ASSETS}
+        self.requests = {provider: 0 for provider in ("newton", "binance", "kraken")}
+        self.errors = {provider: 0 for provider in self.requests}
+        self.runner: web.AppRunner | None = None
+
+    # INFO: Served on /newton, /binance and /kraken.
+    async def start(self, host: str = "127.0.0.1", port: int = 8901):
+        app = web.Application()
+        app.router.add_get("/newton", self.newton)
+        app.router.add_get("/binance", self.binance)
+        app.router.add_get("/kraken", self.kraken)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"requests": dict(self.requests), "errors": dict(self.errors)}
+
+    async def newton(self, request: web.Request) -> web.Response:
+        if await self._inject("newton"):
+            return web.json_response({"error": "injected"}, status=500)
+        now = int(time.time())
+        quotes = []
+        for asset in self.newton_assets:
+            quote = {"symbol": f"{asset}_CAD", **self._quote(asset, FX_RATES["CAD"]), "timestamp": now}
+            if asset in self.malformed:
+                quote["ask"] = "n/a"
+            quotes.append(quote)
+        return web.json_response(quotes)
+
+    async def binance(self, request: web.Request) -> web.Response:
+        if await self._inject("binance"):
+            return web.json_response({"code": -1000, "msg": "injected"}, status=500)
+
+        batch = "symbols" in request.query
+        symbols = json.loads(request.query["symbols"]) if batch else [request.query.get("symbol", "")]
+        assets = [symbol[:-len("USDT")] for symbol in symbols]
+        if any(asset not in self.binance_assets for asset in assets):
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+
+        tickers = []
+        for symbol, asset in zip(symbols, assets):
+            quote = self._quote(asset)
+            tickers.append({
+                "symbol": symbol,
+                "askPrice": str(quote["ask"]),
+                "bidPrice": str(quote["bid"]),
+                "lastPrice": str(quote["spot"]),
+                "priceChangePercent": str(quote["change"])
+            })
+        return web.json_response(tickers if batch else tickers[0])
+
+    async def kraken(self, request: web.Request) -> web.Response:
+        if await self._inject("kraken"):
+            return web.json_response({"error": ["EService:Unavailable"]}, status=500)
+
+        fx_pairs = {pair: (currency, key, inverted) for currency, (pair, key, inverted) in FX_PAIRS.items()}
+        result = {}
+        for pair in request.query.get("pair", "").split(","):
+            if pair in fx_pairs:
+                currency, key, inverted = fx_pairs[pair]
+                rate = 1 / FX_RATES[currency] if inverted else FX_RATES[currency]
+                result[key] = {"a": [str(rate)], "b": [str(rate)], "c": [str(rate)], "o": str(rate)}
+                continue
+
+            asset = pair[:-len("USD")]
+            if asset not in self.kraken_assets:
+                return web.json_response({"error": ["EQuery:Unknown asset pair"], "result": {}})
+            quote = self._quote(asset)
+            result[pair] = {
+                "a": [str(quote["ask"]), "1", "1.000"],
+                "b": [str(quote["bid"]), "1", "1.000"],
+                "c": [str(quote["spot"]), "0.1"],
+                "o": str(quote["spot"] / (1 + quote["change"] / 100))
+            }
+        return web.json_response({"error": [], "result": result})
+
+    async def _inject(self, provider: str) -> bool:
+        self.requests[provider] += 1
+        latency = self.latency.get(provider, self.latency.get("default", 0.0))
+        if latency or self.jitter:
+            await asyncio.sleep(latency + random.uniform(0, self.jitter))
+        if random.random() < self.error_rate.get(provider, self.error_rate.get("default", 0.0)):
+            self.errors[provider] += 1
+            return True
+        return False
+
+    def _quote(self, asset: str, fx: float = 1.0) -> Dict[str, float]:
+        self.prices[asset] *= 1 + random.uniform(-0.001, 0.001)
+        spot = self.prices[asset] * fx
+        return {
+            "ask": spot * 1.001,
+            "bid": spot * 0.999,
+            "spot": spot,
+            "change": round(random.uniform(-5, 5), 2)
+        }
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+from multiprocessing import Queue
+from typing import Any, Dict, List
+import websockets
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# INFO: Load generator, runs in its own process so the server process only pays for the server side of each
+# connection (memory and CPU are measured there).
+# INFO: Every client records when it received each sequence, the runner matches them against the time the server
+# started broadcasting that sequence. Times are wall clock since both processes run on the same host.
+COMPACT_SEQ_OFFSET = 2
+
+
+def frame_sequence(frame: str | bytes, wire_format: str) -> int | None:
+    if wire_format == "compact":
+        return int.from_bytes(frame[COMPACT_SEQ_OFFSET:COMPACT_SEQ_OFFSET + 8], "little")
+    message = msgpack.unpackb(frame) if wire_format == "msgpack" else json.loads(frame)
+    return message.get("seq")
+
+
+async def run_client(
+    url: str,
+    subscribe: Dict[str, Any],
+    wire_format: str,
+    stop_at: float,
+    received: Dict[int, List[float]],
+    counters: Dict[str, int]
+):
+    try:
+        async with websockets.connect(url, max_size=None) as websocket:
+            counters["connected"] += 1
+            await websocket.send(json.dumps(subscribe))
+            while True:
+                remaining = stop_at - time.time()
+                if remaining <= 0:
+                    return
+                try:
+                    frame = await asyncio.wait_for(websocket.recv(), remaining)
+                except asyncio.TimeoutError:
+                    return
+                received_at = time.time()
+                counters["frames"] += 1
+                counters["bytes"] += len(frame)
+                if isinstance(frame, str) and wire_format != "json":
+                    counters["errors"] += 1
+                    continue
+                sequence = frame_sequence(frame, wire_format)
+                if sequence is not None:
+                    received.setdefault(sequence, []).append(received_at)
+    except Exception:
+        counters["failed"] += 1
+
+
+async def generate_load(
+    url: str,
+    clients: int,
+    duration: float,
+    subscribe: Dict[str, Any],
+    wire_format: str,
+    queue: Queue,
+    connect_batch: int = 100
+) -> Dict[str, Any]:
+    received: Dict[int, List[float]] = {}
+    counters = {"connected": 0, "failed": 0, "frames": 0, "bytes": 0, "errors": 0}
+    stop_at = time.time() + duration
+
+    # INFO: Connections are opened in batches so the handshakes do not all hit the server in the same instant.
+    connect_start = time.time()
+    tasks = []
+    for index in range(clients):
+        tasks.append(asyncio.create_task(run_client(url, subscribe, wire_format, stop_at, received, counters)))
+        if (index + 1) % connect_batch == 0:
+            await asyncio.sleep(0.05)
+    while counters["connected"] + counters["failed"] < clients and time.time() < stop_at:
+        await asyncio.sleep(0.05)
+    queue.put({"type": "connected", "connected": counters["connected"], "seconds": time.time() - connect_start})
+
+    await asyncio.gather(*tasks)
+    return {"counters": counters, "received": received}
+
+
+def load_process(
+    url: str,
+    clients: int,
+    duration: float,
+    subscribe: Dict[str, Any],
+    wire_format: str,
+    queue: Queue
+):
+    result = asyncio.run(generate_load(url, clients, duration, subscribe, wire_format, queue))
+    queue.put({"type": "result", **result})
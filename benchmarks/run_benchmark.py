@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Dict, List
+
+# INFO: Benchmark of the whole pipeline against local fake upstreams and a fake (or local) Redis:
+#   python -m benchmarks.run_benchmark --clients 500 --duration 60 --latency 0.05 --error-rate kraken=0.1
+# INFO: The server runs in this process with the real RateProvider and RateWebSocketHandler, the clients run in a
+# child process. The results are printed (or written with --output) as one JSON document so runs can be compared.
+# INFO: The upstream URLs are read from the environment when src is imported, so src is only imported once the
+# fake upstream URLs are set.
+# INFO: --streaming also serves fake Binance and Kraken ticker feeds and runs the server with STREAMING_ENABLED
+# pointed at them, the streamed ticks are merged and broadcast between the REST cycles.
+
+
+def parse_per_provider(values: List[str]) -> Dict[str, float]:
+    parsed = {}
+    for value in values or []:
+        provider, _, amount = value.rpartition("=")
+        parsed[provider or "default"] = float(amount)
+    return parsed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the rates websocket server against fake upstreams")
+    parser.add_argument("--clients", type=int, default=100, help="Number of websocket clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds the clients stay connected")
+    parser.add_argument("--interval", type=float, default=2, help="Update interval of the server in seconds")
+    parser.add_argument("--format", default="json", choices=["json", "msgpack", "compact"], help="Wire format")
+    parser.add_argument("--currency", default="CAD", help="Quote currency the clients subscribe to")
+    parser.add_argument("--latency", action="append", help="Upstream latency in seconds, [provider=]seconds")
+    parser.add_argument("--error-rate", action="append", help="Upstream error rate, [provider=]ratio")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra upstream latency in seconds")
+    parser.add_argument("--newton-assets", type=int, default=60, help="Assets served by the fake Newton")
+    parser.add_argument("--malformed-asset", action="append", help="Asset the fake Newton sends a malformed quote for")
+    parser.add_argument("--streaming", action="store_true", help="Stream the Binance/Kraken tickers from fake feeds")
+    parser.add_argument("--stream-tick", type=float, default=0.2, help="Seconds between the ticks of the fake feeds")
+    parser.add_argument("--redis-url", help="Local Redis to use instead of fakeredis")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900, help="Port of the websocket server")
+    parser.add_argument("--upstream-port", type=int, default=8901, help="Port of the fake upstreams")
+    parser.add_argument("--stream-port", type=int, default=8902, help="Port of the fake ticker feeds")
+    parser.add_argument("--output", help="File to write the JSON results to, stdout by default")
+    return parser.parse_args()
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # INFO: Peak RSS, in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(ratio: float) -> float:
+        return ordered[min(int(len(ordered) * ratio), len(ordered) - 1)]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "max": ordered[-1]
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import websockets
+    from benchmarks.fake_streams import FakeTickerStreams
+    from benchmarks.fake_upstreams import FakeUpstreams
+    from benchmarks.load_generator import load_process
+    from src.cache.redis_cache import RedisCache
+    from src.cache.tiered_cache import TieredCache
+    from src.config.constants import CACHE_TTL_SECONDS
+    from src.providers.rate_provider import RateProvider
+    from src.providers.refresh_scheduler import RefreshScheduler
+    from src.providers.stream_ingestor import StreamIngestor
+    from src.websocket.rate_websocket import RateWebSocketHandler
+    from src.websocket.wire_formats import SUBPROTOCOLS, compression_extensions
+
+    upstreams = FakeUpstreams(
+        latency=parse_per_provider(args.latency),
+        error_rate=parse_per_provider(args.error_rate),
+        jitter=args.jitter,
+        newton_assets=args.newton_assets,
+        malformed_assets=args.malformed_asset
+    )
+    await upstreams.start(args.host, args.upstream_port)
+    streams = FakeTickerStreams(upstreams, interval=args.stream_tick) if args.streaming else None
+    if streams:
+        await streams.start(args.host, args.stream_port)
+
+    redis_cache = RedisCache(args.redis_url or "redis://localhost", ttl_seconds=CACHE_TTL_SECONDS)
+    if not args.redis_url:
+        from fakeredis.aioredis import FakeRedis
+        redis_cache.redis = FakeRedis(decode_responses=True)
+    cache = TieredCache(redis_cache)
+    rate_service = RateProvider(cache)
+    refresh_scheduler = RefreshScheduler(rate_service, interval=args.interval)
+    ingestor = StreamIngestor(rate_service) if args.streaming else None
+    handler = RateWebSocketHandler(rate_service, update_interval=args.interval, ingestor=ingestor)
+
+    # INFO: The fetch cycles and broadcasts are timed by wrapping the instance methods, the code under test is unchanged.
+    fetch_cycles = {"wall": [], "cpu": []}
+    broadcasts = {"wall": [], "cpu": []}
+    broadcast_started: Dict[int, float] = {}
+    fetch_all_rates = rate_service.fetch_all_rates
+    broadcast_snapshot = handler.broadcast_snapshot
+
+    async def timed_fetch_all_rates():
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            return await fetch_all_rates()
+        finally:
+            fetch_cycles["wall"].append(time.perf_counter() - wall)
+            fetch_cycles["cpu"].append(time.process_time() - cpu)
+
+    async def timed_broadcast_snapshot(snapshot):
+        broadcast_started[snapshot.sequence] = time.time()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            return await broadcast_snapshot(snapshot)
+        finally:
+            broadcasts["wall"].append(time.perf_counter() - wall)
+            broadcasts["cpu"].append(time.process_time() - cpu)
+
+    rate_service.fetch_all_rates = timed_fetch_all_rates
+    handler.broadcast_snapshot = timed_broadcast_snapshot
+
+    await cache.start()
+    await rate_service.start()
+    await refresh_scheduler.start()
+    server = await websockets.serve(
+        handler.handle_message,
+        args.host,
+        args.port,
+        subprotocols=SUBPROTOCOLS,
+        process_request=handler.process_request,
+        extensions=compression_extensions(),
+        compression=None
+    )
+    await handler.start_updates()
+    # INFO: Wait for the first snapshot so the clients measure the steady state, not the cold start.
+    await handler.snapshot_store.get()
+
+    queue = multiprocessing.get_context("spawn").Queue()
+    subscribe = {"event": "subscribe", "channel": "rates", "currency": args.currency, "format": args.format}
+    rss_before = rss_bytes()
+    process = multiprocessing.get_context("spawn").Process(
+        target=load_process,
+        args=(f"ws://{args.host}:{args.port}", args.clients, args.duration, subscribe, args.format, queue)
+    )
+    process.start()
+
+    loop = asyncio.get_running_loop()
+    connected = await loop.run_in_executor(None, queue.get)
+    rss_connected = rss_bytes()
+    result = await loop.run_in_executor(None, queue.get)
+    await loop.run_in_executor(None, process.join)
+
+    server.close()
+    await server.wait_closed()
+    await handler.stop_updates()
+    await refresh_scheduler.stop()
+    await rate_service.close()
+    await cache.close()
+    await upstreams.stop()
+    if streams:
+        await streams.stop()
+
+    tick_latencies = [
+        received_at - broadcast_started[sequence]
+        for sequence, times in result["received"].items()
+        if sequence in broadcast_started
+        for received_at in times
+    ]
+    counters = result["counters"]
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "clients": {
+            "requested": args.clients,
+            "connected": connected["connected"],
+            "failed": counters["failed"],
+            "connect_seconds": connected["seconds"],
+            "frames_received": counters["frames"],
+            "bytes_received": counters["bytes"],
+            "error_frames": counters["errors"]
+        },
+        "tick_latency_seconds": summarize(tick_latencies),
+        "fetch_cycle_seconds": summarize(fetch_cycles["wall"]),
+        "fetch_cycle_cpu_seconds": summarize(fetch_cycles["cpu"]),
+        "broadcast_seconds": summarize(broadcasts["wall"]),
+        "broadcast_cpu_seconds": summarize(broadcasts["cpu"]),
+        "memory": {
+            "rss_before_bytes": rss_before,
+            "rss_connected_bytes": rss_connected,
+            "per_connection_bytes": (rss_connected - rss_before) / max(connected["connected"], 1)
+        },
+        "upstreams": upstreams.stats(),
+        "streams": {**streams.stats(), "streamed_assets": len(ingestor.tickers)} if streams else None,
+        "quarantined_assets": sorted(rate_service.quarantined),
+        "cache": cache.stats()
+    }
+
+
+def main():
+    args = parse_args()
+    os.environ.update({
+        "NEWTON_API_URL": f"http://{args.host}:{args.upstream_port}/newton",
+        "BINANCE_API_URL": f"http://{args.host}:{args.upstream_port}/binance",
+        "KRAKEN_API_URL": f"http://{args.host}:{args.upstream_port}/kraken",
+    })
+    if args.streaming:
+        os.environ.update({
+            "STREAMING_ENABLED": "true",
+            "BINANCE_STREAM_URL": f"ws://{args.host}:{args.stream_port}/binance/stream",
+            "KRAKEN_STREAM_URL": f"ws://{args.host}:{args.stream_port}/kraken",
+        })
+    results = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(results)
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
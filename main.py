@@ -1,11 +1,25 @@
 import asyncio
 import logging
+import signal
 import sys
+from multiprocessing.connection import Connection
 import websockets
-from src.config.constants import WEBSOCKET_HOST, WEBSOCKET_PORT, REDIS_URL
+from prometheus_client import start_http_server
+from src.config.constants import (
+    WEBSOCKET_HOST, WEBSOCKET_PORT, REDIS_URL, CLUSTER_MODE, STREAMING_ENABLED, CACHE_TTL_SECONDS, HISTORY_FILE,
+    WORKER_PROCESSES, FETCHER_METRICS_PORT, UPDATE_INTERVAL
+)
+from src.cache.last_snapshot import LastSnapshot
 from src.cache.redis_cache import RedisCache
+from src.cache.tiered_cache import TieredCache
+from src.cluster.cluster_coordinator import ClusterCoordinator
+from src.history.rate_history import RateHistory
 from src.providers.rate_provider import RateProvider
+from src.providers.refresh_scheduler import RefreshScheduler
+from src.providers.stream_ingestor import StreamIngestor
 from src.websocket.rate_websocket import RateWebSocketHandler
+from src.websocket.wire_formats import SUBPROTOCOLS, compression_extensions
+from src.workers.worker_pool import WorkerFeed, WorkerPool
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,12 +30,70 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def serve(rate_handler: RateWebSocketHandler, **kwargs) -> websockets.WebSocketServer:
+    return await websockets.serve(
+        rate_handler.handle_message, 
+        WEBSOCKET_HOST, 
+        WEBSOCKET_PORT,
+        subprotocols=SUBPROTOCOLS,
+        process_request=rate_handler.process_request,
+        extensions=compression_extensions(),
+        compression=None,
+        **kwargs
+    )
+
+# INFO: Worker process of the worker mode, it serves its share of the clients on the shared port (SO_REUSEPORT) and
+# gets the snapshots from the fetcher. Each worker keeps its own history, in its own file.
+async def serve_worker(index: int, connection: Connection):
+    feed = WorkerFeed(connection)
+    history = RateHistory(path=f"{HISTORY_FILE}.{index}" if HISTORY_FILE else None)
+    rate_handler = RateWebSocketHandler(None, update_interval=UPDATE_INTERVAL, feed=feed, history=history)
+
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, feed.stopped.set)
+
+    server = await serve(rate_handler, reuse_port=True)
+    await rate_handler.start_updates()
+    logger.info(f"Worker {index} serving ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
+    try:
+        await feed.stopped.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        await rate_handler.stop_updates()
+
+def run_worker(index: int, connection: Connection):
+    asyncio.run(serve_worker(index, connection))
+
 async def main(): 
     try:
-        redis_cache = RedisCache(REDIS_URL, ttl_seconds=10)
+        # INFO: The entries are kept longer than the update interval, the refresh scheduler keeps them fresh and the
+        # extra time is what lets us serve (flagged) stale data when a refresh fails.
+        redis_cache = TieredCache(RedisCache(REDIS_URL, ttl_seconds=CACHE_TTL_SECONDS))
         rate_service = RateProvider(redis_cache)
-        rate_handler = RateWebSocketHandler(rate_service, update_interval=10)
+        cluster = ClusterCoordinator(REDIS_URL) if CLUSTER_MODE else None
+        refresh_scheduler = RefreshScheduler(rate_service, is_active=(lambda: cluster.is_leader) if cluster else None)
+        # INFO: Streaming is only used on a single node, in cluster mode the snapshots come from the leader's REST cycle.
+        ingestor = StreamIngestor(rate_service) if STREAMING_ENABLED and not CLUSTER_MODE else None
+        # INFO: In worker mode this process only fetches, the workers serve the clients and keep the history.
+        worker_pool = WorkerPool(WORKER_PROCESSES, run_worker) if WORKER_PROCESSES else None
+        rate_handler = RateWebSocketHandler(
+            rate_service,
+            update_interval=UPDATE_INTERVAL,
+            cluster=cluster,
+            ingestor=ingestor,
+            history=None if worker_pool else RateHistory(),
+            worker_pool=worker_pool,
+            # INFO: In cluster mode the nodes already start from the last snapshot published by the leader.
+            last_snapshot=None if CLUSTER_MODE else LastSnapshot(redis_cache)
+        )
 
+        await redis_cache.start()
+        await rate_service.start()
+        await refresh_scheduler.start()
+        if worker_pool:
+            await worker_pool.start()
         await rate_handler.start_updates()
 
         async def path_handler(websocket, path):
@@ -30,18 +102,26 @@ async def main():
             else:
                 await websocket.close(1008, f"Unsupported path: {path}")
         
-        server = await websockets.serve(
-            rate_handler.handle_message, 
-            WEBSOCKET_HOST, 
-            WEBSOCKET_PORT
-        )
-        
-        logger.info(f"WebSocket server started on ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
+        server = None
+        if worker_pool:
+            if FETCHER_METRICS_PORT:
+                start_http_server(FETCHER_METRICS_PORT)
+            logger.info(f"{WORKER_PROCESSES} workers started on ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
+        else:
+            server = await serve(rate_handler)
+            logger.info(f"WebSocket server started on ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
         
         try:
-            await server.wait_closed()
+            if server:
+                await server.wait_closed()
+            else:
+                await worker_pool.wait()
         finally:
             await rate_handler.stop_updates()
+            if worker_pool:
+                await worker_pool.close()
+            await refresh_scheduler.stop()
+            await rate_service.close()
             await redis_cache.close()
             
     except Exception as e:
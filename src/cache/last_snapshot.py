@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict
+from src.cache.serializers import default_serializer
+from src.config.constants import LAST_SNAPSHOT_KEY, SNAPSHOT_FILE, WARM_START_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# INFO: Last good snapshot, kept without TTL so a restarted server has something to serve before its first fetch
+# cycle finishes. It is stored in Redis, or in SNAPSHOT_FILE when set (written to a temporary file then renamed, so a
+# crash mid-write keeps the previous one).
+# INFO: Loading is bounded by WARM_START_TIMEOUT, a slow or unreachable Redis only means a cold start.
+class LastSnapshot:
+    def __init__(
+        self,
+        redis_cache,
+        path: str | None = SNAPSHOT_FILE,
+        key: str = LAST_SNAPSHOT_KEY,
+        timeout: float = WARM_START_TIMEOUT
+    ):
+        self.redis_cache = redis_cache
+        self.path = path
+        self.key = key
+        self.timeout = timeout
+        self.serializer = default_serializer()
+
+    async def load(self) -> Dict[str, Any] | None:
+        try:
+            if self.path:
+                return await asyncio.wait_for(asyncio.to_thread(self._read_file), self.timeout)
+            return await asyncio.wait_for(self.redis_cache.get_persistent(self.key), self.timeout)
+        except Exception as e:
+            logger.error(f"Error loading the last snapshot: {e!r}")
+            return None
+
+    async def save(self, state: Dict[str, Any]) -> None:
+        try:
+            if self.path:
+                await asyncio.to_thread(self._write_file, self.serializer.dumps(state))
+            else:
+                await self.redis_cache.set_persistent(self.key, state)
+        except Exception as e:
+            logger.error(f"Error saving the last snapshot: {e}")
+
+    def _read_file(self) -> Dict[str, Any] | None:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as snapshot_file:
+            return self.serializer.loads(snapshot_file.read())
+
+    def _write_file(self, value: str | bytes):
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "wb") as snapshot_file:
+            snapshot_file.write(value.encode() if isinstance(value, str) else value)
+        os.replace(temporary_path, self.path)
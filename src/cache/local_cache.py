@@ -0,0 +1,54 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+# INFO: In-process TTL/LRU cache, holds decoded objects so a hit costs no network round-trip and no decoding.
+# INFO: Memory is bounded by max_entries, the least recently used entry is evicted first.
+# INFO: Values are shared with the callers, they must not be mutated after being set or returned.
+class LocalCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 10):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            self.entries.pop(key, None)
+            return
+
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def delete(self, keys: List[str]) -> None:
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
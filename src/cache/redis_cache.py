@@ -1,29 +1,72 @@
-from typing import Any
-import json
+from typing import Any, Dict, List, Tuple
 from redis.asyncio import Redis
+from src.cache.serializers import default_serializer
 
 # TODO: Add logging
 # INFO: This Redis cache is used to store the conversion rates and the rates for each asset.
 # INFO: We use this to avoid making repeated calls to the external APIs, which reduces latency for our clients.
 # INFO: We set a default TTL of 10 seconds to resemble the upate time on the newton site. 
 class RedisCache:
-    def __init__(self, redis_url: str = 'redis://localhost', ttl_seconds: int = 10):
+    def __init__(self, redis_url: str = 'redis://localhost', ttl_seconds: int = 10, serializer=None):
         self.redis = Redis.from_url(redis_url, decode_responses=True)
         self.ttl_seconds = ttl_seconds
+        self.serializer = serializer or default_serializer()
 
     async def get(self, key: str) -> Any:
         value = await self.redis.get(key)
         if value:
-            return json.loads(value)
+            return self.serializer.loads(value)
         return None
 
     async def set(self, key: str, value: Any) -> None:
-        str_value = json.dumps(value)
+        str_value = self.serializer.dumps(value)
         await self.redis.set(
             key,
             str_value,
             ex=self.ttl_seconds
         )
 
+    # INFO: Bulk variants, one MGET and one pipelined batch of SETEX instead of a round-trip per key.
+    # INFO: Missing keys are left out of the returned dict.
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        values = await self.redis.mget(keys)
+        return {
+            key: self.serializer.loads(value)
+            for key, value in zip(keys, values)
+            if value
+        }
+
+    # INFO: Same as get_many but also returns the remaining TTL of each key, read in the same pipeline.
+    async def get_many_with_ttl(self, keys: List[str]) -> Dict[str, Tuple[Any, float]]:
+        if not keys:
+            return {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            for key in keys:
+                pipe.pttl(key)
+            values, *ttls = await pipe.execute()
+        return {
+            key: (self.serializer.loads(value), ttl / 1000 if ttl > 0 else self.ttl_seconds)
+            for key, value, ttl in zip(keys, values, ttls)
+            if value
+        }
+
+    async def set_many(self, values: Dict[str, Any]) -> None:
+        if not values:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.setex(key, self.ttl_seconds, self.serializer.dumps(value))
+            await pipe.execute()
+
+    # INFO: Entries without TTL, for state that has to survive the expiry of the rate entries (e.g. the routing table).
+    async def get_persistent(self, key: str) -> Any:
+        return await self.get(key)
+
+    async def set_persistent(self, key: str, value: Any) -> None:
+        await self.redis.set(key, self.serializer.dumps(value))
+
     async def close(self):
-        await self.redis.close()
\ No newline at end of file
+        await self.redis.close()
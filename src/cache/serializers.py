@@ -0,0 +1,30 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# INFO: Serializers used by the cache, anything with dumps/loads can be plugged into RedisCache.
+# INFO: orjson is a lot faster than the stdlib json for the rate payloads, we fall back to json if it is not installed.
+class JsonSerializer:
+    def dumps(self, value: Any) -> str:
+        return json.dumps(value)
+
+    def loads(self, value: str | bytes) -> Any:
+        return json.loads(value)
+
+
+class OrjsonSerializer:
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def loads(self, value: str | bytes) -> Any:
+        return orjson.loads(value)
+
+
+def default_serializer():
+    if orjson:
+        return OrjsonSerializer()
+    return JsonSerializer()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Dict, List
+from src.cache.local_cache import LocalCache
+from src.cache.redis_cache import RedisCache
+from src.config.constants import LOCAL_CACHE_MAX_ENTRIES, CACHE_INVALIDATION_CHANNEL
+from src.utils.metrics import CACHE_LOOKUPS, CACHE_OPERATION_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+# INFO: Two tier cache with the same interface as RedisCache, so it can be handed to the RateProvider as is.
+# INFO: L1 is the in-process LocalCache holding decoded objects, L2 is the shared Redis cache.
+# INFO: Every write publishes the written keys on a channel, the other nodes drop them from their L1.
+# We use our own channel instead of keyspace notifications since those need CONFIG SET, which hosted Redis does not always allow.
+class TieredCache:
+    def __init__(
+        self,
+        redis_cache: RedisCache,
+        local_cache: LocalCache | None = None,
+        channel: str = CACHE_INVALIDATION_CHANNEL
+    ):
+        self.redis_cache = redis_cache
+        self.ttl_seconds = redis_cache.ttl_seconds
+        self.local_cache = local_cache or LocalCache(LOCAL_CACHE_MAX_ENTRIES, redis_cache.ttl_seconds)
+        self.channel = channel
+        self.node_id = uuid.uuid4().hex
+        self.listener_task = None
+        self.counters = {
+            "l1": {"hits": 0, "misses": 0},
+            "l2": {"hits": 0, "misses": 0}
+        }
+
+    async def start(self):
+        self.listener_task = asyncio.create_task(self._listen_for_invalidations())
+
+    async def get(self, key: str) -> Any:
+        return (await self.get_many([key])).get(key)
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.set_many({key: value})
+
+    # INFO: L2 hits are kept in L1 only for the TTL they have left in Redis, so L1 never outlives the shared entry.
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        with timed(CACHE_OPERATION_SECONDS.labels("get")):
+            values = self.local_cache.get_many(keys)
+            self._count("l1", len(values), len(keys) - len(values))
+
+            missing_keys = [key for key in keys if key not in values]
+            if missing_keys:
+                remote_values = await self.redis_cache.get_many_with_ttl(missing_keys)
+                self._count("l2", len(remote_values), len(missing_keys) - len(remote_values))
+                for key, (value, ttl) in remote_values.items():
+                    self.local_cache.set(key, value, ttl)
+                    values[key] = value
+
+            return values
+
+    async def set_many(self, values: Dict[str, Any]) -> None:
+        if not values:
+            return
+
+        with timed(CACHE_OPERATION_SECONDS.labels("set")):
+            for key, value in values.items():
+                self.local_cache.set(key, value)
+
+            serializer = self.redis_cache.serializer
+            invalidation = json.dumps({"node": self.node_id, "keys": list(values)})
+            async with self.redis_cache.redis.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    pipe.setex(key, self.ttl_seconds, serializer.dumps(value))
+                pipe.publish(self.channel, invalidation)
+                await pipe.execute()
+
+    # INFO: Persistent entries are rarely read, they skip L1 and go straight to Redis.
+    async def get_persistent(self, key: str) -> Any:
+        return await self.redis_cache.get_persistent(key)
+
+    async def set_persistent(self, key: str, value: Any) -> None:
+        await self.redis_cache.set_persistent(key, value)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {tier: dict(counters) for tier, counters in self.counters.items()}
+
+    async def close(self):
+        if self.listener_task:
+            self.listener_task.cancel()
+            try:
+                await self.listener_task
+            except asyncio.CancelledError:
+                pass
+        await self.redis_cache.close()
+
+    def _count(self, tier: str, hits: int, misses: int):
+        self.counters[tier]["hits"] += hits
+        self.counters[tier]["misses"] += misses
+        if hits:
+            CACHE_LOOKUPS.labels(tier, "hit").inc(hits)
+        if misses:
+            CACHE_LOOKUPS.labels(tier, "miss").inc(misses)
+
+    # INFO: If the subscription drops we may have missed invalidations, so L1 is cleared before subscribing again.
+    async def _listen_for_invalidations(self):
+        while True:
+            pubsub = self.redis_cache.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = json.loads(message["data"])
+                    if data.get("node") != self.node_id:
+                        self.local_cache.delete(data.get("keys", []))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener failed: {e}")
+                self.local_cache.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
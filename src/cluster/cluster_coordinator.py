@@ -0,0 +1,106 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List
+from redis.asyncio import Redis
+from src.config.constants import (
+    REDIS_URL, CLUSTER_LEASE_SECONDS, CLUSTER_LOCK_KEY, CLUSTER_VERSION_KEY,
+    CLUSTER_SNAPSHOT_KEY, CLUSTER_SNAPSHOT_CHANNEL
+)
+
+logger = logging.getLogger(__name__)
+
+# INFO: Extends the lease only if this node still owns the lock.
+RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# INFO: The ownership check, the version bump, the stored copy and the publish happen atomically,
+# so a node that lost its lease while fetching can not publish an older snapshot with a newer version.
+PUBLISH_SCRIPT = """
+if redis.call("get", KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+local version = redis.call("incr", KEYS[2])
+local message = '{"sequence":' .. version .. ',"timestamp":' .. ARGV[2] .. ',"data":' .. ARGV[3] .. '}'
+redis.call("set", KEYS[3], message)
+redis.call("publish", ARGV[4], message)
+return version
+"""
+
+# INFO: Leader election with a Redis lease plus the pub/sub fan-out of the versioned snapshots.
+# INFO: The leader renews its lease on every tick, if it dies the lease expires and the next node to tick takes over.
+class ClusterCoordinator:
+    def __init__(self, redis_url: str = REDIS_URL, lease_seconds: float = CLUSTER_LEASE_SECONDS):
+        self.redis = Redis.from_url(redis_url, decode_responses=True)
+        self.lease_ms = int(lease_seconds * 1000)
+        self.node_id = uuid.uuid4().hex
+        self.is_leader = False
+        self.renew_script = self.redis.register_script(RENEW_SCRIPT)
+        self.release_script = self.redis.register_script(RELEASE_SCRIPT)
+        self.publish_script = self.redis.register_script(PUBLISH_SCRIPT)
+
+    async def ensure_leadership(self) -> bool:
+        renewed = await self.renew_script(keys=[CLUSTER_LOCK_KEY], args=[self.node_id, self.lease_ms])
+        leader = bool(renewed) or bool(
+            await self.redis.set(CLUSTER_LOCK_KEY, self.node_id, nx=True, px=self.lease_ms)
+        )
+
+        if leader != self.is_leader:
+            logger.info(f"Node {self.node_id} {'acquired' if leader else 'lost'} the leader lease")
+        self.is_leader = leader
+        return leader
+
+    async def publish_snapshot(self, rates: Dict[str, List[Dict[str, Any]]]) -> int:
+        version = await self.publish_script(
+            keys=[CLUSTER_LOCK_KEY, CLUSTER_VERSION_KEY, CLUSTER_SNAPSHOT_KEY],
+            args=[self.node_id, time.time(), json.dumps(rates), CLUSTER_SNAPSHOT_CHANNEL]
+        )
+        if not version:
+            logger.warning(f"Node {self.node_id} lost the leader lease before publishing")
+            self.is_leader = False
+        return version
+
+    # INFO: Last published snapshot, used by nodes that join or reconnect between two ticks.
+    async def load_snapshot(self) -> Dict[str, Any] | None:
+        message = await self.redis.get(CLUSTER_SNAPSHOT_KEY)
+        if message:
+            return json.loads(message)
+        return None
+
+    async def listen(self, on_snapshot: Callable[[Dict[str, Any]], Awaitable[None]]):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(CLUSTER_SNAPSHOT_CHANNEL)
+                snapshot = await self.load_snapshot()
+                if snapshot:
+                    await on_snapshot(snapshot)
+
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await on_snapshot(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cluster snapshot listener failed: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def close(self):
+        if self.is_leader:
+            await self.release_script(keys=[CLUSTER_LOCK_KEY], args=[self.node_id])
+        await self.redis.close()
@@ -7,14 +7,27 @@ WEBSOCKET_PORT = int(os.getenv('PORT', 8765))
 WEBSOCKET_HOST = "0.0.0.0" 
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost')
 
+# INFO: Slow consumer policy for the broadcast. A client whose outbound buffer is above the limit skips the tick,
+# after the max amount of consecutive skipped ticks the client is disconnected.
+CLIENT_WRITE_BUFFER_LIMIT = int(os.getenv('CLIENT_WRITE_BUFFER_LIMIT', 256 * 1024))
+CLIENT_MAX_DROPPED_FRAMES = int(os.getenv('CLIENT_MAX_DROPPED_FRAMES', 3))
+
+# INFO: permessage-deflate settings. Context takeover is kept, the JSON deltas repeat the same keys and symbols every
+# tick so the shared window pays off, the smaller window and memory level cap the compressor memory per client.
+WS_COMPRESSION = os.getenv('WS_COMPRESSION', 'true').lower() == 'true'
+WS_DEFLATE_WINDOW_BITS = int(os.getenv('WS_DEFLATE_WINDOW_BITS', 12))
+WS_DEFLATE_MEM_LEVEL = int(os.getenv('WS_DEFLATE_MEM_LEVEL', 5))
+WS_DEFLATE_LEVEL = int(os.getenv('WS_DEFLATE_LEVEL', 6))
+
 # INFO: We had to use three services to fetach all the rates for the supported assets
 # Newton api did not support all assets anymore, so we had to add Binance and Kraken.
 # If any of the assets is not supported by Newton, the rate provider will fetch the rates from Binance or Kraken.
-# INFO: We use Kraken for USD/CAD conversion.
+# INFO: We use Kraken for the FX rates of the quote currencies.
 # INFO: QCAD is not supported by any of the services
-NEWTON_API_URL = 'https://api.newton.co/markets/v1.1/rates/'
-BINANCE_API_URL = 'https://api.binance.com/api/v3/ticker/24hr'
-KRAKEN_API_URL = 'https://api.kraken.com/0/public/Ticker'
+# INFO: The URLs can be overridden to run against the local fake upstreams of the benchmarks.
+NEWTON_API_URL = os.getenv('NEWTON_API_URL', 'https://api.newton.co/markets/v1.1/rates/')
+BINANCE_API_URL = os.getenv('BINANCE_API_URL', 'https://api.binance.com/api/v3/ticker/24hr')
+KRAKEN_API_URL = os.getenv('KRAKEN_API_URL', 'https://api.kraken.com/0/public/Ticker')
 
 
 SUPPORTED_ASSETS = [
@@ -26,4 +39,95 @@ SUPPORTED_ASSETS = [
     "SOL", "ALGO", "LUNC", "UST", "ZEC", "XTZ", "AMP", "REN", "UMA", "SHIB",
     "LRC", "ANKR", "HBAR", "EGLD", "AVAX", "ONE", "GALA", "ALICE", "ATOM",
     "DYDX", "CELO", "STORJ", "SKL", "CTSI", "BAND", "ENS", "RNDR", "MASK", "APE"
-] # 75 assets
\ No newline at end of file
+] # 75 assets
+
+# INFO: Quote currencies the feed is published in, clients pick one when they subscribe (CAD by default).
+# All of them are derived from the same USD base table with the FX matrix fetched from Kraken.
+QUOTE_CURRENCIES = [
+    currency.strip().upper()
+    for currency in os.getenv('QUOTE_CURRENCIES', 'CAD,USD,EUR').split(',')
+    if currency.strip()
+]
+DEFAULT_QUOTE_CURRENCY = 'CAD'
+if DEFAULT_QUOTE_CURRENCY not in QUOTE_CURRENCIES:
+    QUOTE_CURRENCIES.insert(0, DEFAULT_QUOTE_CURRENCY)
+
+# INFO: Long-lived HTTP pool shared by all the upstream providers.
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', 20))
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', 300))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 60))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 5))
+
+# INFO: Seconds between two fetch cycles (ticks) of the update loop.
+UPDATE_INTERVAL = float(os.getenv('UPDATE_INTERVAL', 10))
+
+# INFO: Refresh-ahead. Every cache entry of the upstream rates is rewritten in the background once per tick, in the
+# REFRESH_LEAD_SECONDS before the update loop reads it, the refreshes are staggered over that window by provider and
+# batch of assets. While refreshes succeed the data age at broadcast time stays under REFRESH_LEAD_SECONDS plus the
+# fetch time. Entries older than STALE_AFTER_SECONDS are served flagged as stale, entries are kept for
+# CACHE_TTL_SECONDS so there is stale data to serve when a refresh fails.
+REFRESH_LEAD_SECONDS = float(os.getenv('REFRESH_LEAD_SECONDS', 3))
+REFRESH_BATCH_SIZE = int(os.getenv('REFRESH_BATCH_SIZE', 20))
+STALE_AFTER_SECONDS = float(os.getenv('STALE_AFTER_SECONDS', 15))
+CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', 60))
+
+# INFO: In-process cache in front of Redis, entries written by other nodes are invalidated over pub/sub.
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', 1024))
+CACHE_INVALIDATION_CHANNEL = os.getenv('CACHE_INVALIDATION_CHANNEL', 'cache_invalidation')
+
+# INFO: Cluster mode, when several dynos run, only the node holding the leader lease fetches the rates.
+# The snapshot is published on a Redis channel and every node broadcasts it to its own clients.
+CLUSTER_MODE = os.getenv('CLUSTER_MODE', 'false').lower() == 'true'
+CLUSTER_LEASE_SECONDS = float(os.getenv('CLUSTER_LEASE_SECONDS', 30))
+CLUSTER_LOCK_KEY = 'rates_leader'
+CLUSTER_VERSION_KEY = 'rates_snapshot_version'
+CLUSTER_SNAPSHOT_KEY = 'rates_snapshot'
+CLUSTER_SNAPSHOT_CHANNEL = 'rates_snapshots'
+
+# INFO: Worker mode, WORKER_PROCESSES processes ("auto" for one per core) serve the websocket port together with
+# SO_REUSEPORT (Linux and BSD), the main process only fetches and hands every snapshot to them over a pipe. 0 keeps the
+# single process server. The workers each serve their own /metrics, the fetch metrics are on FETCHER_METRICS_PORT.
+WORKER_PROCESSES = (
+    os.cpu_count() or 1 if os.getenv('WORKER_PROCESSES', '0') == 'auto' else int(os.getenv('WORKER_PROCESSES', 0))
+)
+WORKER_PIPE_BUFFER_LIMIT = int(os.getenv('WORKER_PIPE_BUFFER_LIMIT', 4 * 1024 * 1024))
+FETCHER_METRICS_PORT = int(os.getenv('FETCHER_METRICS_PORT', 0))
+
+# INFO: Optional streaming ingestion, the Binance and Kraken sourced assets are kept up to date from the exchange
+# websocket feeds and pushed at most every STREAM_MIN_INTERVAL seconds. REST polling keeps running as the fallback.
+STREAMING_ENABLED = os.getenv('STREAMING_ENABLED', 'false').lower() == 'true'
+STREAM_MIN_INTERVAL = float(os.getenv('STREAM_MIN_INTERVAL', 1.0))
+STREAM_STALE_SECONDS = float(os.getenv('STREAM_STALE_SECONDS', 30))
+BINANCE_STREAM_URL = os.getenv('BINANCE_STREAM_URL', 'wss://stream.binance.com:9443/stream')
+KRAKEN_STREAM_URL = os.getenv('KRAKEN_STREAM_URL', 'wss://ws.kraken.com')
+
+# INFO: Rate history, a ring buffer of HISTORY_CAPACITY samples per symbol (24h at the 10s update interval), fed by
+# every fetch cycle. With HISTORY_FILE set the raw samples are kept in a memory-mapped file and survive restarts.
+# OHLC candles are kept for each of HISTORY_RESOLUTIONS (seconds) over HISTORY_HORIZON_SECONDS.
+HISTORY_CAPACITY = int(os.getenv('HISTORY_CAPACITY', 8640))
+HISTORY_FILE = os.getenv('HISTORY_FILE') or None
+HISTORY_RESOLUTIONS = [int(resolution) for resolution in os.getenv('HISTORY_RESOLUTIONS', '60,300,3600').split(',')]
+HISTORY_HORIZON_SECONDS = int(os.getenv('HISTORY_HORIZON_SECONDS', 24 * 60 * 60))
+HISTORY_MAX_POINTS = int(os.getenv('HISTORY_MAX_POINTS', 1500))
+
+# INFO: Routing table of the asset to the provider that last served it, persisted in Redis without TTL.
+# Routed assets (and unsupported ones) are probed again through the full Binance -> Kraken cascade on this schedule.
+ROUTING_TABLE_KEY = 'asset_routes'
+ROUTE_REPROBE_SECONDS = float(os.getenv('ROUTE_REPROBE_SECONDS', 6 * 60 * 60))
+
+# INFO: Warm start, the last good snapshot is persisted without TTL (in Redis, or in SNAPSHOT_FILE when set) with the
+# FX rates and the asset sources. It is served flagged as stale on boot until the first live cycle replaces it.
+LAST_SNAPSHOT_KEY = 'rates_last_snapshot'
+SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE') or None
+WARM_START_TIMEOUT = float(os.getenv('WARM_START_TIMEOUT', 2))
+
+# INFO: Resilience settings of the upstream calls. Each attempt has its own deadline and a whole fetch cycle has a
+# latency budget, so a slow provider can not delay the tick past it. Hedging races a second attempt once the first
+# one is slower than the provider's HEDGE_PERCENTILE latency, it is off by default since it adds upstream load.
+ATTEMPT_TIMEOUT = float(os.getenv('ATTEMPT_TIMEOUT', 2.5))
+FETCH_CYCLE_BUDGET = float(os.getenv('FETCH_CYCLE_BUDGET', 6))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv('CIRCUIT_RECOVERY_TIMEOUT', 30))
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', 0)) or None
@@ -0,0 +1,211 @@
+import logging
+import os
+import zlib
+from typing import Any, Dict, List
+import numpy as np
+from src.config.constants import (
+    SUPPORTED_ASSETS, QUOTE_CURRENCIES, DEFAULT_QUOTE_CURRENCY,
+    HISTORY_CAPACITY, HISTORY_FILE, HISTORY_RESOLUTIONS, HISTORY_HORIZON_SECONDS, HISTORY_MAX_POINTS
+)
+
+logger = logging.getLogger(__name__)
+
+FILE_VERSION = 1
+HEADER_SIZE = 8
+BID, ASK, SPOT = 0, 1, 2
+OPEN, HIGH, LOW, CLOSE = 0, 1, 2, 3
+
+
+# INFO: Rows of a ring (oldest first) whose time is within [start, end]. The times of a ring are increasing, so the
+# bounds are found with a binary search over the logical positions, the cost is O(log n + window).
+def ring_window(times: np.ndarray, head: int, count: int, start: float, end: float) -> np.ndarray:
+    capacity = len(times)
+    first = head - count + 1
+
+    def bisect(value: float, right: bool) -> int:
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            time = times[(first + middle) % capacity]
+            if time < value or (right and time == value):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    return (first + np.arange(bisect(start, False), bisect(end, True))) % capacity
+
+
+# INFO: OHLC candles of the spot price of every symbol at one resolution, updated on every sample.
+# INFO: One row per bucket holds the candles of all the currencies and assets, so a sample updates them all at once.
+class CandleRing:
+    def __init__(self, resolution: int, buckets: int, shape: tuple):
+        self.resolution = resolution
+        self.starts = np.full(buckets, np.nan)
+        self.ohlc = np.full((buckets, *shape, 4), np.nan)
+        self.head = -1
+        self.count = 0
+
+    def add(self, timestamp: float, spots: np.ndarray):
+        start = timestamp - timestamp % self.resolution
+        if self.count and start < self.starts[self.head]:
+            return
+
+        if not self.count or start > self.starts[self.head]:
+            self.head = (self.head + 1) % len(self.starts)
+            self.count = min(self.count + 1, len(self.starts))
+            self.starts[self.head] = start
+            self.ohlc[self.head] = spots[..., np.newaxis]
+            return
+
+        candle = self.ohlc[self.head]
+        candle[..., OPEN] = np.where(np.isnan(candle[..., OPEN]), spots, candle[..., OPEN])
+        candle[..., HIGH] = np.fmax(candle[..., HIGH], spots)
+        candle[..., LOW] = np.fmin(candle[..., LOW], spots)
+        candle[..., CLOSE] = np.where(np.isnan(spots), candle[..., CLOSE], spots)
+
+    def query(self, currency: int, asset: int, start: float, end: float, limit: int) -> List[Dict[str, Any]]:
+        rows = ring_window(self.starts, self.head, self.count, start, end)[-limit:]
+        candles = self.ohlc[rows, currency, asset]
+        return [
+            {"timestamp": timestamp, "open": open_, "high": high, "low": low, "close": close}
+            for timestamp, (open_, high, low, close) in zip(self.starts[rows].tolist(), candles.tolist())
+            if open_ == open_
+        ]
+
+
+# INFO: Memory bounded history of the rates, fed with the result of every fetch cycle.
+# INFO: The raw ring keeps (timestamp, bid, ask, spot) of every asset in the default quote currency and the FX ratio
+# of every quote currency to it at the same sample, so the history of any symbol is one multiplication away.
+# INFO: With a path the raw ring lives in a memory-mapped file. Its header holds the layout and a checksum of the
+# assets and currencies, a file written with another layout is started over. The candles are rebuilt from it on load.
+class RateHistory:
+    def __init__(
+        self,
+        assets: List[str] = SUPPORTED_ASSETS,
+        currencies: List[str] = QUOTE_CURRENCIES,
+        capacity: int = HISTORY_CAPACITY,
+        path: str | None = HISTORY_FILE,
+        resolutions: List[int] = HISTORY_RESOLUTIONS,
+        horizon: int = HISTORY_HORIZON_SECONDS,
+        max_points: int = HISTORY_MAX_POINTS
+    ):
+        self.assets = list(assets)
+        self.currencies = list(currencies)
+        self.asset_index = {asset: index for index, asset in enumerate(self.assets)}
+        self.currency_index = {currency: index for index, currency in enumerate(self.currencies)}
+        self.capacity = capacity
+        self.max_points = max_points
+        self.path = path
+        self._open_storage()
+        self.candles = {
+            resolution: CandleRing(resolution, horizon // resolution + 1, (len(self.currencies), len(self.assets)))
+            for resolution in resolutions
+        }
+        self._rebuild_candles()
+
+    def _open_storage(self):
+        layout = f"{','.join(self.assets)}|{','.join(self.currencies)}".encode()
+        header = [FILE_VERSION, zlib.crc32(layout), self.capacity, len(self.assets), len(self.currencies)]
+        size = HEADER_SIZE + self.capacity * (1 + len(self.assets) * 3 + len(self.currencies))
+
+        storage = None
+        if self.path and os.path.exists(self.path) and os.path.getsize(self.path) == size * 8:
+            storage = np.memmap(self.path, dtype=np.float64, mode="r+", shape=(size,))
+            if storage[:len(header)].tolist() != header:
+                logger.warning(f"History file {self.path} has another layout, starting over")
+                storage = None
+        if storage is None:
+            if self.path:
+                storage = np.memmap(self.path, dtype=np.float64, mode="w+", shape=(size,))
+            else:
+                storage = np.zeros(size)
+            storage[:len(header)] = header
+            storage[5], storage[6] = -1, 0
+
+        self.storage = storage
+        self.header = storage[:HEADER_SIZE]
+        offset = HEADER_SIZE
+        self.times = storage[offset:offset + self.capacity]
+        offset += self.capacity
+        self.values = storage[offset:offset + self.capacity * len(self.assets) * 3].reshape(self.capacity, len(self.assets), 3)
+        offset += self.capacity * len(self.assets) * 3
+        self.fx = storage[offset:].reshape(self.capacity, len(self.currencies))
+        logger.info(f"Rate history opened with {self.count} samples ({self.path or 'in memory'})")
+
+    @property
+    def head(self) -> int:
+        return int(self.header[5])
+
+    @property
+    def count(self) -> int:
+        return int(self.header[6])
+
+    def _rebuild_candles(self):
+        for row in ring_window(self.times, self.head, self.count, -np.inf, np.inf):
+            spots = self.values[row, :, SPOT] * self.fx[row, :, np.newaxis]
+            for candles in self.candles.values():
+                candles.add(self.times[row], spots)
+
+    # INFO: rates is the result of a fetch cycle, the rates of every quote currency keyed by currency.
+    def record(self, timestamp: float, rates: Dict[str, List[Dict[str, Any]]]):
+        base_rates = rates.get(DEFAULT_QUOTE_CURRENCY)
+        if not base_rates or (self.count and timestamp <= self.times[self.head]):
+            return
+
+        spots = np.full((len(self.currencies), len(self.assets)), np.nan)
+        values = np.full((len(self.assets), 3), np.nan)
+        for rate in base_rates:
+            asset = self.asset_index.get(rate["symbol"].rpartition("_")[0])
+            if asset is not None:
+                values[asset] = (rate["bid"], rate["ask"], rate["spot"])
+
+        fx = np.full(len(self.currencies), np.nan)
+        for currency, currency_rates in rates.items():
+            index = self.currency_index.get(currency)
+            if index is None:
+                continue
+            for rate in currency_rates:
+                asset = self.asset_index.get(rate["symbol"].rpartition("_")[0])
+                if asset is not None:
+                    spots[index, asset] = rate["spot"]
+            # INFO: Every currency is derived from the same base table, any asset priced in both gives the ratio.
+            priced = (values[:, SPOT] > 0) & (spots[index] > 0)
+            if priced.any():
+                fx[index] = np.median(spots[index, priced] / values[priced, SPOT])
+
+        head = (self.head + 1) % self.capacity
+        self.times[head] = timestamp
+        self.values[head] = values
+        self.fx[head] = fx
+        self.header[5], self.header[6] = head, min(self.count + 1, self.capacity)
+
+        for candles in self.candles.values():
+            candles.add(timestamp, spots)
+
+    def _resolve(self, symbol: str) -> tuple:
+        asset, _, currency = symbol.rpartition("_")
+        if asset not in self.asset_index or currency not in self.currency_index:
+            raise ValueError(f"Unknown symbol: {symbol}")
+        return self.asset_index[asset], self.currency_index[currency]
+
+    # INFO: Raw samples of a symbol within [start, end], the latest max_points of them.
+    def history(self, symbol: str, start: float, end: float) -> List[Dict[str, Any]]:
+        asset, currency = self._resolve(symbol)
+        rows = ring_window(self.times, self.head, self.count, start, end)[-self.max_points:]
+        values = self.values[rows, asset] * self.fx[rows, currency, np.newaxis]
+        return [
+            {"timestamp": timestamp, "bid": bid, "ask": ask, "spot": spot}
+            for timestamp, (bid, ask, spot) in zip(self.times[rows].tolist(), values.tolist())
+            if spot == spot
+        ]
+
+    def candles_for(self, symbol: str, resolution: int, start: float, end: float) -> List[Dict[str, Any]]:
+        asset, currency = self._resolve(symbol)
+        if resolution not in self.candles:
+            raise ValueError(f"Unsupported resolution, expected one of: {', '.join(map(str, self.candles))}")
+        return self.candles[resolution].query(currency, asset, start, end, self.max_points)
+
+    def close(self):
+        if isinstance(self.storage, np.memmap):
+            self.storage.flush()
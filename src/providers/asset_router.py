@@ -0,0 +1,73 @@
+import logging
+import random
+import time
+from typing import Any, Dict, List
+from src.config.constants import SUPPORTED_ASSETS, ROUTING_TABLE_KEY, ROUTE_REPROBE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# INFO: Precomputed once, replaces splitting every Newton symbol on every cycle.
+SYMBOL_ASSETS = {f"{asset}_CAD": asset for asset in SUPPORTED_ASSETS}
+
+# INFO: Maps each asset to the provider that last served it ("newton", "binance", "kraken" or "unsupported"),
+# so every cycle goes straight to the right provider instead of trying Binance first for everything.
+# INFO: Each route has its own re-probe time, jittered so the routes learned in the same cycle are not all probed
+# again at once. The table is persisted in Redis without TTL so it survives restarts.
+class AssetRouter:
+    def __init__(self, redis_cache, reprobe_seconds: float = ROUTE_REPROBE_SECONDS, key: str = ROUTING_TABLE_KEY):
+        self.redis_cache = redis_cache
+        self.reprobe_seconds = reprobe_seconds
+        self.key = key
+        # INFO: asset -> {"provider": str, "reprobe_at": float}
+        self.routes: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+
+    async def load(self):
+        try:
+            routes = await self.redis_cache.get_persistent(self.key)
+            if routes:
+                self.routes = {asset: route for asset, route in routes.items() if asset in SUPPORTED_ASSETS}
+                logger.info(f"Loaded {len(self.routes)} asset routes")
+        except Exception as e:
+            logger.error(f"Error loading asset routes: {e}")
+
+    async def save(self):
+        if not self.dirty:
+            return
+        try:
+            await self.redis_cache.set_persistent(self.key, self.routes)
+            self.dirty = False
+        except Exception as e:
+            logger.error(f"Error saving asset routes: {e}")
+
+    def provider_for(self, asset: str) -> str | None:
+        route = self.routes.get(asset)
+        return route["provider"] if route else None
+
+    def assets_for(self, provider: str) -> List[str]:
+        return [asset for asset, route in self.routes.items() if route["provider"] == provider]
+
+    # INFO: Splits the assets Newton did not serve into the ones with a known route and the ones that need a probe
+    # (no route yet, routed to Newton but missing this cycle, or due for a re-probe). Unsupported assets are skipped
+    # until their re-probe is due.
+    def plan(self, missing_assets: List[str]) -> Dict[str, List[str]]:
+        now = time.time()
+        plan = {"binance": [], "kraken": [], "probe": []}
+        for asset in missing_assets:
+            route = self.routes.get(asset)
+            if route is None or route["reprobe_at"] <= now or route["provider"] == "newton":
+                plan["probe"].append(asset)
+            elif route["provider"] in plan:
+                plan[route["provider"]].append(asset)
+        return plan
+
+    def record(self, asset: str, provider: str):
+        route = self.routes.get(asset)
+        if route and route["provider"] == provider and route["reprobe_at"] > time.time():
+            return
+
+        self.routes[asset] = {
+            "provider": provider,
+            "reprobe_at": time.time() + self.reprobe_seconds * random.uniform(0.8, 1.2)
+        }
+        self.dirty = True
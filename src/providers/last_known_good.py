@@ -0,0 +1,54 @@
+import logging
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List
+import numpy as np
+from src.providers.rate_table import RateTable
+
+logger = logging.getLogger(__name__)
+
+# INFO: Last valid USD quote of every asset, with when it was ingested and the provider it came from.
+# INFO: Each cycle updates it with the rows that passed validation, then fills the rows that are missing (the provider
+# failed, or its quote was quarantined) from it, flagged as stale. The snapshot is then complete as soon as every asset
+# has been served once, one bad or missing quote no longer drops the symbol.
+class LastKnownGood:
+    def __init__(self, assets: List[str]):
+        self.table = RateTable(assets)
+        self.updated_at = np.full(len(assets), np.nan)
+
+    def update(self, table: RateTable, now: float | None = None):
+        rows = np.flatnonzero(table.valid_mask())
+        self.table.copy_rows(table, rows)
+        self.updated_at[rows] = now or time.time()
+
+    # INFO: Warm start, seeds the table with the USD rows of the persisted snapshot, as of when it was taken, so a
+    # provider failing in the first live cycles after a restart still has its assets filled. The rows go through the
+    # same validation as a cycle, source_for gives the provider of each asset.
+    def seed(self, rates: List[Dict[str, Any]], source_for: Callable[[str], str | None], updated_at: float):
+        quotes: Dict[str | None, Dict[str, Dict[str, Any]]] = {}
+        for rate in rates:
+            asset = rate["symbol"].rpartition("_")[0]
+            if asset in self.table.index:
+                quotes.setdefault(source_for(asset), {})[asset] = rate
+        table = RateTable(self.table.assets)
+        for source, source_quotes in quotes.items():
+            table.load(source_quotes, source=source)
+        table.finalize()
+        table.quarantine()
+        self.update(table, updated_at)
+
+    # INFO: Returns the assets that were filled in.
+    def fill(self, table: RateTable) -> List[str]:
+        rows = np.flatnonzero(~table.valid_mask() & self.table.present)
+        if not len(rows):
+            return []
+        table.copy_rows(self.table, rows)
+        table.stale[rows] = True
+
+        assets = [self.table.assets[row] for row in rows.tolist()]
+        sources = Counter(self.table.sources[row] for row in rows.tolist())
+        oldest = time.time() - np.nanmin(self.updated_at[rows])
+        logger.warning(
+            f"Serving the last known good rates of {len(assets)} assets {dict(sources)}, the oldest from {oldest:.0f}s ago"
+        )
+        return assets
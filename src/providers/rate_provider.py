@@ -1,129 +1,461 @@
 from typing import List, Dict, Any
 import aiohttp
+import json
 import logging
 from src.cache.redis_cache import RedisCache
-from src.config.constants import SUPPORTED_ASSETS, NEWTON_API_URL, BINANCE_API_URL, KRAKEN_API_URL
-from src.utils.api_retry import retry_async_function
-from src.utils.currency_conversion import fetch_usd_cad_rate
+from src.config.constants import (
+    SUPPORTED_ASSETS, QUOTE_CURRENCIES, NEWTON_API_URL, BINANCE_API_URL, KRAKEN_API_URL,
+    ATTEMPT_TIMEOUT, FETCH_CYCLE_BUDGET, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT, HEDGE_PERCENTILE,
+    STALE_AFTER_SECONDS
+)
+from src.utils.api_retry import retry_async_function, CircuitBreaker, LatencyTracker, NonRetryableError
+from src.utils.currency_conversion import FALLBACK_FX_RATES, fetch_fx_rates
+from src.utils.http_pool import HttpClientPool
+from src.utils.metrics import FETCH_CYCLE_SECONDS, INVALID_RATES, VALIDATION_SECONDS, timed
+from src.providers.asset_router import AssetRouter, SYMBOL_ASSETS
+from src.providers.last_known_good import LastKnownGood
+from src.providers.rate_table import RateTable
 import asyncio
 import time
 
 logger = logging.getLogger(__name__)
 # INFO: This class is responsible for fetching all the rates for the supported assets.
 class RateProvider:
-    def __init__(self, redis_cache: RedisCache):
+    def __init__(self, redis_cache: RedisCache, http_pool: HttpClientPool | None = None):
         self.redis_cache = redis_cache
-        self.assets_not_supported = set()
-        
+        self.http_pool = http_pool or HttpClientPool()
+        self.router = AssetRouter(redis_cache)
+        # INFO: One circuit breaker and latency window per upstream provider.
+        self.breakers = {
+            provider: CircuitBreaker(provider, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT)
+            for provider in ("newton", "binance", "kraken")
+        }
+        self.latencies = {provider: LatencyTracker() for provider in self.breakers}
+        # INFO: Last FX matrix (amount of each quote currency for one USD) and which provider served each missing asset,
+        # used by the streaming ingestor.
+        self.fx_rates: Dict[str, float] = {}
+        self.asset_sources: Dict[str, str] = {}
+        # INFO: When this process last wrote each upstream cache entry, used to flag the stale ones.
+        self.refreshed_at: Dict[str, float] = {}
+        # INFO: When the update loop last read the cache (monotonic), the refresh scheduler times its rounds on it.
+        self.read_at: float | None = None
+        # INFO: Last valid quote of every asset, and the latest invalid quote of each asset that got quarantined.
+        self.last_good = LastKnownGood(SUPPORTED_ASSETS)
+        self.quarantined: Dict[str, Dict[str, Any]] = {}
+
+    # INFO: The HTTP pool lives for the whole process, it is opened and closed with the server.
+    async def start(self):
+        await self.http_pool.open()
+        await self.router.load()
+
+    async def close(self):
+        await self.http_pool.close()
+
+    # INFO: Retry settings shared by every call to a provider within a cycle, the deadline is the cycle's latency budget.
+    def resilience(self, provider: str, deadline: float) -> Dict[str, Any]:
+        return {
+            "attempt_timeout": ATTEMPT_TIMEOUT,
+            "deadline": deadline,
+            "breaker": self.breakers[provider],
+            "latency_tracker": self.latencies[provider],
+            "hedge_percentile": HEDGE_PERCENTILE
+        }
+
     # INFO: Since we are using asyncio, one optimization is to parallel process API requests, but that is overkill for this.
     # instead of fetching in paralle and having to deal with threads, we can just use asyncio gather to fetch them concurrently.
-    async def fetch_all_rates(self) -> List[Dict[str, Any]]:
+    # INFO: Returns the rates of every quote currency, keyed by currency.
+    async def fetch_all_rates(self) -> Dict[str, List[Dict[str, Any]]]:
 
-        # INFO: Benchmarking API calls 
-        start_time = time.time()
+        # INFO: Benchmarking API calls, each stage is observed in the fetch cycle histogram.
+        # The missing_assets stage is only added when there were missing assets.
+        start_time = time.perf_counter()
         timings = {
             'newton': 0,
-            'binance': 0,
-            'kraken': 0,
+            'table': 0,
             'total': 0
         }
 
-        async with aiohttp.ClientSession() as session:
-            newton_start = time.time()
-            newton_task = retry_async_function(
+        session = await self.http_pool.open()
+        self.read_at = time.monotonic()
+        deadline = self.read_at + FETCH_CYCLE_BUDGET
+        newton_start = time.perf_counter()
+        # INFO: Both cache entries are read in a single round-trip, the fetch functions only hit the APIs on a miss.
+        # A miss is passed as an empty value so they do not read the cache again, None means not looked up.
+        cached = await self.redis_cache.get_many(["newton_rates", "fx_rates"])
+        cached_fx_rates = cached.get("fx_rates")
+        if cached_fx_rates and not all(currency in cached_fx_rates for currency in QUOTE_CURRENCIES):
+            cached_fx_rates = None
+        newton_task = self._cached_or_fetch(
+            cached.get("newton_rates"),
+            self.fetch_newton_rates,
+            session,
+            [],
+            retries=3,
+            initial_delay=0.1,
+            **self.resilience("newton", deadline)
+        )
+        fx_task = self._cached_or_fetch(
+            cached_fx_rates,
+            fetch_fx_rates,
+            session,
+            QUOTE_CURRENCIES,
+            self.redis_cache,
+            {},
+            False,
+            retries=3,
+            initial_delay=0.1,
+            **self.resilience("kraken", deadline)
+        )
+        
+        newton_rates, fx_rates = await asyncio.gather(
+            newton_task, 
+            fx_task
+        )
+
+        timings['newton'] = time.perf_counter() - newton_start
+        
+        # INFO: The FX rates that were fetched are merged over the previous matrix, the currencies Kraken did not return
+        # keep their last rate and their rows are flagged as stale. The fallback rates are only used until a matrix was
+        # loaded once. Without Newton its assets are served from the last known good rates.
+        # INFO: A cached matrix older than the stale limit (its refreshes keep failing) flags every currency as stale,
+        # like the other entries. On a miss this cycle fetched it, which counts as a refresh.
+        fetched_fx_rates = fx_rates or {}
+        if fetched_fx_rates and not cached_fx_rates:
+            self.record_refresh(["fx_rates"])
+        fx_rates_stale = self.is_stale("fx_rates")
+        fx_rates = {**(self.fx_rates or FALLBACK_FX_RATES), **fetched_fx_rates}
+        stale_currencies = {
+            currency for currency in QUOTE_CURRENCIES
+            if currency != "USD" and (fx_rates_stale or currency not in fetched_fx_rates)
+        }
+        if stale_currencies:
+            logger.warning(f"No fresh FX rates for {sorted(stale_currencies)}, reusing the previous ones")
+        if not fx_rates.get("CAD"):
+            logger.error("Failed to fetch initial rates")
+            return {}
+        self.fx_rates = fx_rates
+        newton_rates = newton_rates or []
+        if not newton_rates:
+            logger.error("Failed to fetch the Newton rates, serving the last known good ones")
+
+        # INFO: Compute the missing assets, the ones routed to Newton are not probed elsewhere when Newton failed.
+        available_assets = {SYMBOL_ASSETS[rate["symbol"]] for rate in newton_rates}
+        for asset in available_assets:
+            self.router.record(asset, "newton")
+        missing_assets = [
+            asset for asset in SUPPORTED_ASSETS
+            if asset not in available_assets and (newton_rates or self.router.provider_for(asset) != "newton")
+        ]
+        
+        # INFO: Newton quotes are in CAD and get converted to the USD base in the table, the Binance and Kraken ones
+        # are already in USD.
+        table = RateTable(SUPPORTED_ASSETS)
+        table.load({SYMBOL_ASSETS[rate["symbol"]]: rate for rate in newton_rates}, fx=1 / fx_rates["CAD"], source="newton")
+
+        if missing_assets:
+            missing_start = time.perf_counter()
+            api_quotes = await self.process_missing_assets(missing_assets, session, deadline)
+            timings['missing_assets'] = time.perf_counter() - missing_start
+
+            for source in ("binance", "kraken"):
+                table.load(
+                    {asset: quote for asset, quote in api_quotes.items() if self.asset_sources.get(asset) == source},
+                    source=source
+                )
+            table.load(self.populate_assets_not_supported(), source="unsupported")
+            table.mark_stale(
+                asset for asset in api_quotes
+                if self.is_stale(f"{self.asset_sources.get(asset)}_quote_{asset}")
+            )
+        if self.is_stale("newton_rates"):
+            table.mark_stale(available_assets)
+        # INFO: The CAD rate turns the Newton quotes into the USD base, so without a fresh one every row is stale.
+        if "CAD" in stale_currencies:
+            table.mark_stale(SUPPORTED_ASSETS)
+        await self.router.save()
+
+        table_start = time.perf_counter()
+        table.finalize()
+        # INFO: Validation happens once here, as the quotes are ingested. Invalid ones are quarantined, then the valid
+        # rows become the last known good rates and the missing rows are filled from them.
+        with timed(VALIDATION_SECONDS):
+            self.quarantine(table.quarantine())
+            self.last_good.update(table)
+            self.last_good.fill(table)
+        rates = table.to_wire_by_currency(fx_rates, QUOTE_CURRENCIES, stale_currencies)
+        timings['table'] = time.perf_counter() - table_start
+
+        timings['total'] = time.perf_counter() - start_time
+        for stage, duration in timings.items():
+            FETCH_CYCLE_SECONDS.labels(stage).observe(duration)
+        logger.debug(f"Rate fetching timings: {timings}, http pool: {self.http_pool.stats()}")
+
+        return rates
+    # INFO: A cached entry is used as is, even while the provider's circuit is open (it may be the stale data we have
+    # to serve), only a miss goes through the retries.
+    async def _cached_or_fetch(self, cached_value: Any, func, *args, **kwargs) -> Any:
+        if cached_value:
+            return cached_value
+        return await retry_async_function(func, *args, **kwargs)
+
+    # INFO: Refresh-ahead, called by the RefreshScheduler to rewrite a cache entry before it goes stale.
+    # It always goes to the upstream and returns False when the refresh failed, the previous entry is kept.
+    async def refresh(self, source: str, assets: List[str] | None = None) -> bool:
+        session = await self.http_pool.open()
+        deadline = time.monotonic() + FETCH_CYCLE_BUDGET
+        if source == "newton":
+            result = await retry_async_function(
                 self.fetch_newton_rates,
                 session,
-                retries=3,
-                initial_delay=0.1
+                [],
+                retries=1,
+                initial_delay=0.1,
+                **self.resilience("newton", deadline)
             )
-            usd_cad_task = retry_async_function(
-                fetch_usd_cad_rate,
+        elif source == "fx":
+            result = await retry_async_function(
+                fetch_fx_rates,
                 session,
+                QUOTE_CURRENCIES,
                 self.redis_cache,
-                retries=3,
-                initial_delay=0.1
-            )
-            
-            newton_rates, usd_cad_rate = await asyncio.gather(
-                newton_task, 
-                usd_cad_task
+                {},
+                False,
+                retries=1,
+                initial_delay=0.1,
+                **self.resilience("kraken", deadline)
             )
+            if result:
+                self.record_refresh(["fx_rates"])
+        elif source == "binance":
+            result = await self.fetch_binance_rates_batch(assets or [], session, {}, deadline)
+        elif source == "kraken":
+            result = await self.fetch_kraken_rates_batch(assets or [], session, {}, deadline)
+        else:
+            raise ValueError(f"Unknown refresh source: {source}")
+        return bool(result)
 
-            timings['newton'] = time.time() - newton_start
-            
-            if not newton_rates or not usd_cad_rate:
-                logger.error("Failed to fetch initial rates")
-                return []
-
-            # INFO: Compute the missing assets
-            # TODO: We could use a better way to identify assets instead of splitting the symbol, we could also deduplicate before.
-            available_assets = {rate["symbol"].split("_")[0] for rate in newton_rates}
-            missing_assets = set(SUPPORTED_ASSETS) - available_assets
-            
-            if not missing_assets:
-                timings['total'] = time.time() - start_time
-                return newton_rates
+    # INFO: quotes maps each asset to its invalid quote with its source, as returned by RateTable.quarantine.
+    def quarantine(self, quotes: Dict[str, Dict[str, Any]]):
+        if not quotes:
+            return
+        now = time.time()
+        for asset, quote in quotes.items():
+            INVALID_RATES.labels(quote["source"] or "unknown").inc()
+            self.quarantined[asset] = {**quote, "quarantined_at": now}
+        logger.warning(f"Quarantined invalid rates: {quotes}")
 
-            binance_start = time.time()
-            api_data = await self.process_missing_assets(missing_assets, session, usd_cad_rate) 
+    def record_refresh(self, keys: List[str]):
+        now = time.time()
+        for key in keys:
+            self.refreshed_at[key] = now
+
+    # INFO: Entries this process did not write (e.g. left in Redis by a previous process) have an unknown age,
+    # they count as stale until they are refreshed.
+    def is_stale(self, key: str) -> bool:
+        refreshed_at = self.refreshed_at.get(key)
+        return refreshed_at is None or time.time() - refreshed_at > STALE_AFTER_SECONDS
 
-            timings['binance'] = time.time() - binance_start
-            
-            timings['total'] = time.time() - start_time
-            logger.info(f"Rate fetching timings: {timings}")
-            
-            return newton_rates + api_data + self.populate_assets_not_supported()
     # INFO: We are populating the assets after checking with Kraken, could be removed if we don't need to return them.
-    def populate_assets_not_supported(self) -> List[Dict[str, Any]]:
-        return [{"symbol": f"{asset}_CAD", "ask": 0, "bid": 0, "spot": 0, "change": 0} for asset in self.assets_not_supported]
+    def populate_assets_not_supported(self) -> Dict[str, Dict[str, Any]]:
+        return {asset: {"ask": 0, "bid": 0, "spot": 0, "change": 0} for asset in self.router.assets_for("unsupported")}
 
+    # INFO: Missing assets go straight to the provider the router knows for them, with one batched request per provider.
+    # INFO: Assets without a route (or due for a re-probe) and the routed ones a batch did not return go through the
+    # per-asset cascade, Binance first and Kraken for the rest. Assets that fail both are routed as unsupported,
+    # unless a provider was skipped by its circuit breaker or the cycle ran out of budget.
     async def process_missing_assets(
         self, 
         missing_asset_list: List[str], 
         session: aiohttp.ClientSession, 
-        usd_cad_rate: float
-    ) -> List[Dict[str, Any]]:
+        deadline: float
+    ) -> Dict[str, Dict[str, Any]]:
 
-        binance_tasks = [
-            self.binance_with_retry(asset, session, usd_cad_rate)
-            for asset in missing_asset_list
-        ]
-        binance_results = await asyncio.gather(*binance_tasks)
-        
-        # INFO: Any failed assets will be funneled to Kraken by checking if Binance did not produce a result for an asset. 
-        failed_assets = []
-        valid_results = []
-        
-        for asset, result in zip(missing_asset_list, binance_results):
-            if result is None:
-                failed_assets.append(asset)
-            else:
-                valid_results.append(result)
-        
-        if failed_assets:
-            kraken_tasks = [
-                self.kraken_with_retry(asset, session, usd_cad_rate)
+        plan = self.router.plan(missing_asset_list)
+
+        # INFO: The Binance and Kraken cache entries of every missing asset are read in one round-trip.
+        cached_rates = await self.get_cached_rates(["binance", "kraken"], missing_asset_list)
+
+        binance_results, kraken_results = await asyncio.gather(
+            self.fetch_binance_rates_batch(plan["binance"], session, cached_rates["binance"], deadline),
+            self.fetch_kraken_rates_batch(plan["kraken"], session, cached_rates["kraken"], deadline)
+        )
+
+        sources = {asset: "binance" for asset in binance_results}
+        sources.update({asset: "kraken" for asset in kraken_results})
+        results = {**binance_results, **kraken_results}
+
+        planned_assets = plan["probe"] + plan["binance"] + plan["kraken"]
+        cascade_assets = [asset for asset in planned_assets if asset not in results]
+        if cascade_assets:
+            binance_fallback = await asyncio.gather(*[
+                self.binance_with_retry(asset, session, deadline)
+                for asset in cascade_assets
+            ])
+            for asset, result in zip(cascade_assets, binance_fallback):
+                if result is not None:
+                    results[asset] = result
+                    sources[asset] = "binance"
+
+            # INFO: Any failed assets will be funneled to Kraken by checking if Binance did not produce a result for an asset. 
+            failed_assets = [asset for asset in cascade_assets if asset not in results]
+            kraken_fallback = await asyncio.gather(*[
+                self.kraken_with_retry(asset, session, deadline)
                 for asset in failed_assets
-            ]
-            kraken_results = await asyncio.gather(*kraken_tasks)
-            valid_results.extend([result for result in kraken_results if result is not None])
-        
-        return valid_results
+            ])
+            probe_complete = (
+                time.monotonic() < deadline
+                and self.breakers["binance"].state == "closed"
+                and self.breakers["kraken"].state == "closed"
+            )
+            for asset, result in zip(failed_assets, kraken_fallback):
+                if result is not None:
+                    results[asset] = result
+                    sources[asset] = "kraken"
+                elif probe_complete:
+                    self.router.record(asset, "unsupported")
+
+        for asset, source in sources.items():
+            self.router.record(asset, source)
+        self.asset_sources = sources
+        return results
+
+    async def fetch_binance_rates_batch(
+        self,
+        assets: List[str],
+        session: aiohttp.ClientSession,
+        cached_rates: Dict[str, Dict[str, Any]],
+        deadline: float
+    ) -> Dict[str, Dict[str, Any]]:
+        results = {asset: cached_rates[asset] for asset in assets if asset in cached_rates}
+        uncached_assets = [asset for asset in assets if asset not in results]
+        if not uncached_assets:
+            return results
+
+        tickers = await retry_async_function(
+            self.fetch_binance_tickers,
+            uncached_assets,
+            session,
+            retries=1,
+            initial_delay=0.2,
+            **self.resilience("binance", deadline)
+        )
+        if not tickers:
+            return results
+
+        fetched = {}
+        for asset in uncached_assets:
+            ticker = tickers.get(f"{asset}USDT")
+            if ticker is None:
+                continue
+            try:
+                fetched[asset] = self.parse_binance_ticker(asset, ticker)
+            except Exception as e:
+                logger.warning(f"Skipping Binance batch result for {asset}: {e}")
+
+        await self.set_cached_rates("binance", fetched)
+        results.update(fetched)
+        return results
+
+    # INFO: Binance rejects the whole batch if one of the symbols is not listed, only assets routed to Binance are batched,
+    # so this only happens when one of them got delisted and the cascade re-routes it.
+    async def fetch_binance_tickers(self, assets: List[str], session: aiohttp.ClientSession) -> Dict[str, Dict[str, Any]]:
+        symbols = json.dumps([f"{asset}USDT" for asset in assets], separators=(",", ":"))
+        async with session.get(BINANCE_API_URL, params={"symbols": symbols}) as response:
+            if response.status == 400:
+                raise NonRetryableError("Binance batch contains a symbol that is not listed")
+            if response.status != 200:
+                raise Exception(f"Binance batch API failed with status code: {response.status}")
+            data = await response.json()
+            return {ticker["symbol"]: ticker for ticker in data}
+
+    async def fetch_kraken_rates_batch(
+        self,
+        assets: List[str],
+        session: aiohttp.ClientSession,
+        cached_rates: Dict[str, Dict[str, Any]],
+        deadline: float
+    ) -> Dict[str, Dict[str, Any]]:
+        results = {asset: cached_rates[asset] for asset in assets if asset in cached_rates}
+        uncached_assets = [asset for asset in assets if asset not in results]
+        if not uncached_assets:
+            return results
+
+        tickers = await retry_async_function(
+            self.fetch_kraken_tickers,
+            uncached_assets,
+            session,
+            retries=1,
+            initial_delay=0.2,
+            **self.resilience("kraken", deadline)
+        )
+        if not tickers:
+            return results
+
+        fetched = {}
+        for asset in uncached_assets:
+            ticker = tickers.get(f"{asset}USD")
+            if ticker is None:
+                continue
+            try:
+                fetched[asset] = self.parse_kraken_ticker(asset, ticker)
+            except Exception as e:
+                logger.warning(f"Skipping Kraken batch result for {asset}: {e}")
+
+        await self.set_cached_rates("kraken", fetched)
+        results.update(fetched)
+        return results
+
+    async def fetch_kraken_tickers(self, assets: List[str], session: aiohttp.ClientSession) -> Dict[str, Dict[str, Any]]:
+        pairs = ",".join(f"{asset}USD" for asset in assets)
+        async with session.get(KRAKEN_API_URL, params={"pair": pairs}) as response:
+            if response.status != 200:
+                raise Exception(f"Kraken batch API failed with status code: {response.status}")
+            data = await response.json()
+            errors = data.get("error")
+            if errors:
+                # INFO: EQuery errors are about the request itself (e.g. an unknown pair), the others can be transient.
+                if any(error.startswith("EQuery") for error in errors):
+                    raise NonRetryableError(f"Kraken batch API returned errors: {errors}")
+                raise Exception(f"Kraken batch API returned errors: {errors}")
+            return data.get("result", {})
+
+    async def get_cached_rates(self, providers: List[str], assets: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        cached = await self.redis_cache.get_many([
+            f"{provider}_quote_{asset}"
+            for provider in providers
+            for asset in assets
+        ])
+        return {
+            provider: {
+                asset: cached[f"{provider}_quote_{asset}"]
+                for asset in assets
+                if f"{provider}_quote_{asset}" in cached
+            }
+            for provider in providers
+        }
+
+    async def set_cached_rates(self, provider: str, rates: Dict[str, Dict[str, Any]]) -> None:
+        values = {
+            f"{provider}_quote_{asset}": rate
+            for asset, rate in rates.items()
+        }
+        await self.redis_cache.set_many(values)
+        self.record_refresh(list(values))
 
     async def binance_with_retry(
         self, 
         asset: str, 
         session: aiohttp.ClientSession, 
-        usd_cad_rate: float
+        deadline: float
     ) -> Dict[str, Any] | None:
         try:
             return await retry_async_function(
                 self.fetch_binance_rate,
                 asset,
                 session,
-                usd_cad_rate,
                 retries=2,
-                initial_delay=0.2
+                initial_delay=0.2,
+                **self.resilience("binance", deadline)
             )
         except Exception as e:
             logger.warning(f"Binance fetch failed for {asset}: {e}")
@@ -133,16 +465,16 @@ class RateProvider:
         self, 
         asset: str, 
         session: aiohttp.ClientSession, 
-        usd_cad_rate: float
+        deadline: float
     ) -> Dict[str, Any] | None:
         try:
             return await retry_async_function(
                 self.fetch_kraken_rate,
                 asset,
                 session,
-                usd_cad_rate,
                 retries=2,
-                initial_delay=0.2
+                initial_delay=0.2,
+                **self.resilience("kraken", deadline)
             )
         except Exception as e:
             logger.warning(f"Kraken fetch failed for {asset}: {e}")
@@ -150,9 +482,14 @@ class RateProvider:
 
     # INFO: These all contain the fetching logic for the difrerent APIs, we also check the cache first before fetching.
     # INFO: We are funelling missing assets through the diferent APIs, with Newton as the starting layer. 
-    async def fetch_newton_rates(self, session: aiohttp.ClientSession) -> List[Dict[str, Any]]:
+    async def fetch_newton_rates(
+        self,
+        session: aiohttp.ClientSession,
+        cached_rates: List[Dict[str, Any]] | None = None
+    ) -> List[Dict[str, Any]]:
         try:
-            cached_rates = await self.redis_cache.get("newton_rates")
+            if cached_rates is None:
+                cached_rates = await self.redis_cache.get("newton_rates")
             if cached_rates:
                 logger.info("Fetched Newton rates from cache")
                 return cached_rates
@@ -163,17 +500,18 @@ class RateProvider:
                     data = await response.json()
                     rates =  [
                         rate for rate in data 
-                        if rate["symbol"].split("_")[0] in SUPPORTED_ASSETS
+                        if rate["symbol"] in SYMBOL_ASSETS
                     ]
                     await self.redis_cache.set("newton_rates", rates)
+                    self.record_refresh(["newton_rates"])
                     return rates
         except Exception as e:
             logger.error(f"Error fetching Newton rates: {e}")
-            return []
+            raise
 
-    async def fetch_binance_rate(self, asset: str, session: aiohttp.ClientSession, usd_cad_rate: float) -> Dict[str, Any]:
+    async def fetch_binance_rate(self, asset: str, session: aiohttp.ClientSession) -> Dict[str, Any]:
         try:
-            cache_key = f"binance_rate_{asset}"
+            cache_key = f"binance_quote_{asset}"
 
             cached_rate = await self.redis_cache.get(cache_key)
             if cached_rate:
@@ -181,28 +519,22 @@ class RateProvider:
                 return cached_rate
             else:
                 async with session.get(f'{BINANCE_API_URL}?symbol={asset}USDT') as response:
+                    if response.status == 400:
+                        raise NonRetryableError(f"Binance does not list {asset}")
                     if response.status != 200:
                         raise Exception(f"Binance API failed with status code: {response.status}")
                     data = await response.json()
-                    rate = {
-                        "symbol": f"{asset}_CAD",
-                        "ask": float(data["askPrice"]) * usd_cad_rate,
-                        "bid": float(data["bidPrice"]) * usd_cad_rate,
-                        "spot": float(data["lastPrice"]) * usd_cad_rate,
-                        "change": float(data["priceChangePercent"])
-                    }
-                    # TODO: We can add better validation here, sometimes Binace has no data for an asset, but will still return a response.
-                    if rate["ask"] == 0 and rate["bid"] == 0 and rate["spot"] == 0:
-                        raise Exception(f"Invalid response from Binance for {asset}")
+                    rate = self.parse_binance_ticker(asset, data)
                     await self.redis_cache.set(cache_key, rate)
+                    self.record_refresh([cache_key])
                     return rate
         except Exception as e:
             logger.error(f"Error fetching Binance rate for {asset}: {e}")
-            return None
+            raise
 
-    async def fetch_kraken_rate(self, asset: str, session: aiohttp.ClientSession, usd_cad_rate: float) -> Dict[str, Any]:
+    async def fetch_kraken_rate(self, asset: str, session: aiohttp.ClientSession) -> Dict[str, Any]:
         try:
-            cache_key = f"kraken_rate_{asset}"
+            cache_key = f"kraken_quote_{asset}"
             
             cached_rate = await self.redis_cache.get(cache_key)
             if cached_rate:
@@ -215,21 +547,36 @@ class RateProvider:
                 
                 data = await response.json()
                 if "result" not in data or f"{asset}USD" not in data["result"]:
-                    self.assets_not_supported.add(asset)
-                    raise Exception(f"Invalid response from Kraken for {asset}")
+                    raise NonRetryableError(f"Invalid response from Kraken for {asset}")
                     
-                result = data["result"][f"{asset}USD"]
-                rate = {
-                    "symbol": f"{asset}_CAD",
-                    "ask": float(result["a"][0]) * usd_cad_rate,
-                    "bid": float(result["b"][0]) * usd_cad_rate,
-                    "spot": float(result["c"][0]) * usd_cad_rate,
-                    "change": (float(result["c"][0]) - float(result["o"])) / float(result["o"]) * 100
-                }
+                rate = self.parse_kraken_ticker(asset, data["result"][f"{asset}USD"])
                 
                 await self.redis_cache.set(cache_key, rate)
+                self.record_refresh([cache_key])
                 return rate
                 
         except Exception as e:
             logger.error(f"Error fetching Kraken rate for {asset}: {e}")
-            return None
\ No newline at end of file
+            raise
+
+    # INFO: Shared by the single and the batched requests.
+    # INFO: They return the USD quote, the FX conversion happens in the RateTable.
+    def parse_binance_ticker(self, asset: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        rate = {
+            "ask": float(data["askPrice"]),
+            "bid": float(data["bidPrice"]),
+            "spot": float(data["lastPrice"]),
+            "change": float(data["priceChangePercent"])
+        }
+        # TODO: We can add better validation here, sometimes Binace has no data for an asset, but will still return a response.
+        if rate["ask"] == 0 and rate["bid"] == 0 and rate["spot"] == 0:
+            raise NonRetryableError(f"Invalid response from Binance for {asset}")
+        return rate
+
+    def parse_kraken_ticker(self, asset: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "ask": float(result["a"][0]),
+            "bid": float(result["b"][0]),
+            "spot": float(result["c"][0]),
+            "open": float(result["o"])
+        }
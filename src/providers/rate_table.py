@@ -0,0 +1,188 @@
+import logging
+import math
+from typing import Any, Dict, Iterable, List
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = ("ask", "bid", "spot", "change")
+
+
+# INFO: A field that is missing or not a number becomes NaN, so its row fails validation and gets quarantined instead
+# of failing the whole table.
+def to_float(value: Any) -> float:
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+# INFO: Same rules as RateTable.valid_mask for a single quote, used where quotes arrive one at a time (the streams).
+# A quote without change needs an open price to compute it from.
+def is_valid_quote(quote: Dict[str, Any]) -> bool:
+    try:
+        ask, bid, spot = (float(quote[field]) for field in ("ask", "bid", "spot"))
+        has_change = quote.get("change") is not None
+        change = float(quote["change"] if has_change else quote["open"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (
+        all(math.isfinite(value) for value in (ask, bid, spot, change))
+        and (has_change or change > 0)
+        and ask >= 0 and bid >= 0 and spot >= 0
+        and ask >= bid
+    )
+
+
+# INFO: Columnar table of the rates of one tick, one numpy array per field and a symbol index to find the rows.
+# INFO: The table is the USD base of the tick. Providers load their quotes in bulk with the FX factor that turns them
+# into USD (CAD/USD for Newton, 1 for Binance and Kraken). The change, the FX conversion and the validation then run
+# over whole columns, and the table is turned into the wire format of each quote currency once per tick.
+# INFO: Each row keeps the provider it was loaded from. quarantine validates the rows once when a cycle is ingested
+# and drops the invalid ones, so a bad quote never reaches a snapshot.
+class RateTable:
+    def __init__(self, assets: List[str]):
+        self.assets = list(assets)
+        self.index = {asset: row for row, asset in enumerate(self.assets)}
+        size = len(self.assets)
+        self.ask = np.full(size, np.nan)
+        self.bid = np.full(size, np.nan)
+        self.spot = np.full(size, np.nan)
+        self.change = np.full(size, np.nan)
+        self.open = np.full(size, np.nan)
+        # INFO: Newton sends a timestamp with its rates, it is passed through as is.
+        self.timestamps: Dict[str, Any] = {}
+        self.sources: List[str | None] = [None] * size
+        self.fx = np.ones(size)
+        self.present = np.zeros(size, dtype=bool)
+        # INFO: Rows served from a cache entry the refresh-ahead did not manage to refresh in time.
+        self.stale = np.zeros(size, dtype=bool)
+
+    # INFO: quotes maps an asset to a dict with ask, bid, spot and optionally change, open and timestamp.
+    # A quote without change gets it computed from its open price.
+    def load(self, quotes: Dict[str, Dict[str, Any]], fx: float = 1.0, source: str | None = None):
+        if not quotes:
+            return
+        count = len(quotes)
+        rows = np.fromiter((self.index[asset] for asset in quotes), dtype=np.intp, count=count)
+        values = list(quotes.values())
+
+        for name in ("ask", "bid", "spot", "change", "open"):
+            column = getattr(self, name)
+            column[rows] = np.fromiter(
+                (to_float(quote.get(name)) for quote in values),
+                dtype=np.float64,
+                count=count
+            )
+        self.fx[rows] = fx
+        self.present[rows] = True
+        for row in rows.tolist():
+            self.sources[row] = source
+        self.timestamps.update({
+            asset: quote["timestamp"]
+            for asset, quote in quotes.items()
+            if quote.get("timestamp") is not None
+        })
+
+    # INFO: Copies the given rows of a table with the same assets, used by the last known good rates.
+    def copy_rows(self, other: "RateTable", rows: np.ndarray):
+        for name in (*PRICE_FIELDS, "open", "fx", "present", "stale"):
+            getattr(self, name)[rows] = getattr(other, name)[rows]
+        for row in rows.tolist():
+            self.sources[row] = other.sources[row]
+            asset = self.assets[row]
+            if asset in other.timestamps:
+                self.timestamps[asset] = other.timestamps[asset]
+            else:
+                self.timestamps.pop(asset, None)
+
+    def mark_stale(self, assets: Iterable[str]):
+        rows = [self.index[asset] for asset in assets if asset in self.index]
+        self.stale[rows] = True
+
+    def finalize(self):
+        missing_change = np.isnan(self.change) & (self.open > 0)
+        self.change[missing_change] = (
+            (self.spot[missing_change] - self.open[missing_change]) / self.open[missing_change] * 100
+        )
+
+        self.ask *= self.fx
+        self.bid *= self.fx
+        self.spot *= self.fx
+        self.fx[:] = 1.0
+
+    # INFO: Wire format of every quote currency of the FX matrix. The rows of the stale_currencies (whose FX rate is a
+    # reused one) are all flagged as stale.
+    def to_wire_by_currency(
+        self,
+        fx_rates: Dict[str, float],
+        currencies: List[str],
+        stale_currencies: Iterable[str] = ()
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        rows = self.valid_rows()
+        stale_currencies = set(stale_currencies)
+        return {
+            currency: self.to_wire(currency, fx_rates[currency], rows, currency in stale_currencies)
+            for currency in currencies
+            if currency in fx_rates
+        }
+
+    # INFO: Finite, non-negative prices and ask >= bid, applied to all the rows at once.
+    def valid_mask(self) -> np.ndarray:
+        prices = np.vstack([getattr(self, name) for name in PRICE_FIELDS])
+        return (
+            self.present
+            & np.isfinite(prices).all(axis=0)
+            & (self.ask >= 0) & (self.bid >= 0) & (self.spot >= 0)
+            & (self.ask >= self.bid)
+        )
+
+    # INFO: Drops the invalid rows and returns their quotes (in USD) with their source, keyed by asset.
+    def quarantine(self) -> Dict[str, Dict[str, Any]]:
+        invalid = np.flatnonzero(self.present & ~self.valid_mask())
+        quotes = {
+            self.assets[row]: {
+                "source": self.sources[row],
+                **{name: getattr(self, name)[row].item() for name in PRICE_FIELDS}
+            }
+            for row in invalid.tolist()
+        }
+        self.present[invalid] = False
+        return quotes
+
+    # INFO: Rows served to the clients. The rows are expected to be quarantined already, the check is kept here so
+    # an invalid row can never be encoded.
+    def valid_rows(self) -> np.ndarray:
+        return np.flatnonzero(self.valid_mask())
+
+    # INFO: fx_rate is the amount of the quote currency for one USD, the change is a percentage and is not converted.
+    def to_wire(
+        self,
+        quote_currency: str = "USD",
+        fx_rate: float = 1.0,
+        rows: np.ndarray | None = None,
+        all_stale: bool = False
+    ) -> List[Dict[str, Any]]:
+        if rows is None:
+            rows = self.valid_rows()
+        assets = [self.assets[row] for row in rows]
+        columns = zip(
+            assets,
+            (self.ask[rows] * fx_rate).tolist(),
+            (self.bid[rows] * fx_rate).tolist(),
+            (self.spot[rows] * fx_rate).tolist(),
+            self.change[rows].tolist(),
+            (self.stale[rows] | all_stale).tolist()
+        )
+
+        rates = []
+        for asset, ask, bid, spot, change, stale in columns:
+            rate = {"symbol": f"{asset}_{quote_currency}", "ask": ask, "bid": bid, "spot": spot, "change": change}
+            if asset in self.timestamps:
+                rate["timestamp"] = self.timestamps[asset]
+            if stale:
+                rate["stale"] = True
+            rates.append(rate)
+        return rates
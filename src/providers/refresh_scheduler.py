@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+from src.config.constants import UPDATE_INTERVAL, REFRESH_LEAD_SECONDS, REFRESH_BATCH_SIZE
+from src.providers.rate_provider import RateProvider
+from src.utils.metrics import CACHE_REFRESHES
+
+logger = logging.getLogger(__name__)
+
+# INFO: Refresh-ahead scheduler (stale-while-revalidate). The update loop only reads the cache, this rewrites every
+# upstream entry in the background before it goes stale, so ticks neither read almost expired data nor all hit the
+# cold upstream path at once.
+# INFO: One round per tick of the update loop (interval), timed on its last read of the cache: the round ends at the
+# next read and its jobs (Newton, FX, and the Binance and Kraken assets in batches of batch_size) are spread over the
+# lead seconds before it, each in its own slot with a bit of jitter so the requests never come in bursts. Every entry
+# is then refreshed once per tick and is at most about lead seconds old when read.
+# INFO: A failed refresh keeps the previous entry, the provider flags it as stale once it is older than the limit.
+# INFO: is_active lets cluster followers skip the refreshes, only the leader fetches.
+class RefreshScheduler:
+    def __init__(
+        self,
+        rate_provider: RateProvider,
+        interval: float = UPDATE_INTERVAL,
+        lead: float = REFRESH_LEAD_SECONDS,
+        batch_size: int = REFRESH_BATCH_SIZE,
+        is_active: Callable[[], bool] | None = None
+    ):
+        self.rate_provider = rate_provider
+        self.interval = interval
+        self.lead = min(lead, interval)
+        self.batch_size = batch_size
+        self.is_active = is_active
+        self.task: asyncio.Task | None = None
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.round_end: float | None = None
+
+    async def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = [task for task in (self.task, *self.in_flight.values()) if task]
+        self.task = None
+        self.in_flight.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # INFO: The jobs are rebuilt every round, so the assets follow the routes the update loop learns.
+    def jobs(self) -> List[Tuple[str, str, List[str] | None]]:
+        jobs = [("newton", "newton", None), ("fx", "fx", None)]
+        for provider in ("binance", "kraken"):
+            assets = sorted(self.rate_provider.router.assets_for(provider))
+            for start in range(0, len(assets), self.batch_size):
+                batch = assets[start:start + self.batch_size]
+                jobs.append((f"{provider}:{batch[0]}", provider, batch))
+        return jobs
+
+    # INFO: The next read is one interval after the last one, or one lead from now before the first read. The read the
+    # previous round was for may not have happened yet when it ends, so the next round targets the first read after it.
+    def next_read_at(self) -> float:
+        now = time.monotonic()
+        read_at = self.rate_provider.read_at
+        next_read = now + self.lead if read_at is None else read_at + self.interval
+        while self.round_end is not None and next_read < self.round_end + self.lead:
+            next_read += self.interval
+        return max(next_read, now)
+
+    async def _run(self):
+        while True:
+            try:
+                self.round_end = self.next_read_at()
+                round_start = max(self.round_end - self.lead, time.monotonic())
+                jobs = self.jobs()
+                slot = (self.round_end - round_start) / len(jobs)
+                for index, (name, source, assets) in enumerate(jobs):
+                    start_at = round_start + index * slot + random.uniform(0, slot * 0.2)
+                    await asyncio.sleep(max(0, start_at - time.monotonic()))
+                    # INFO: A job still running from the previous round is not started twice.
+                    running = self.in_flight.get(name)
+                    if running and not running.done():
+                        continue
+                    self.in_flight[name] = asyncio.create_task(self._refresh(source, assets))
+                await asyncio.sleep(max(0, self.round_end - time.monotonic()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in refresh scheduler: {e}")
+                await asyncio.sleep(1)
+
+    async def _refresh(self, source: str, assets: List[str] | None):
+        if self.is_active and not self.is_active():
+            return
+        try:
+            refreshed = await self.rate_provider.refresh(source, assets)
+        except Exception as e:
+            logger.error(f"Error refreshing {source}: {e}")
+            refreshed = False
+        CACHE_REFRESHES.labels(source, "success" if refreshed else "failed").inc()
+        if not refreshed:
+            logger.warning(f"Refresh of {source} failed, serving the cached data until it goes stale")
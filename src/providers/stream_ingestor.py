@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Set, Tuple
+import websockets
+from src.config.constants import BINANCE_STREAM_URL, KRAKEN_STREAM_URL, STREAM_STALE_SECONDS, QUOTE_CURRENCIES
+from src.providers.rate_provider import RateProvider
+from src.providers.rate_table import RateTable, is_valid_quote
+
+logger = logging.getLogger(__name__)
+
+# INFO: Keeps persistent ticker subscriptions on the Binance and Kraken websocket feeds for the assets
+# the REST cycle resolved to those providers, so their prices do not wait for the next poll.
+# INFO: The ticker table holds the USD quotes in order of arrival, the handler drains the assets that changed on its own
+# interval, which conflates bursts of ticks into one update. Quotes are converted to every quote currency in a RateTable
+# on the way out. Invalid ticks are quarantined as they arrive, the previous tick (or the REST rate) stays.
+# INFO: The stream URLs are injectable so it can run against a local fake ticker server.
+class StreamIngestor:
+    def __init__(
+        self,
+        rate_provider: RateProvider,
+        binance_url: str = BINANCE_STREAM_URL,
+        kraken_url: str = KRAKEN_STREAM_URL,
+        stale_seconds: float = STREAM_STALE_SECONDS
+    ):
+        self.rate_provider = rate_provider
+        self.urls = {"binance": binance_url, "kraken": kraken_url}
+        self.stale_seconds = stale_seconds
+        self.tickers: OrderedDict[str, Tuple[float, Dict[str, Any]]] = OrderedDict()
+        self.dirty: Set[str] = set()
+        self.stream_assets: Dict[str, frozenset] = {}
+        self.stream_tasks: Dict[str, asyncio.Task] = {}
+
+    # INFO: Called after every REST cycle, a stream is only reconnected when its set of assets changed.
+    def sync_assets(self):
+        for exchange in ("binance", "kraken"):
+            assets = frozenset(
+                asset for asset, source in self.rate_provider.asset_sources.items()
+                if source == exchange
+            )
+            if assets == self.stream_assets.get(exchange, frozenset()):
+                continue
+
+            self.stream_assets[exchange] = assets
+            task = self.stream_tasks.pop(exchange, None)
+            if task:
+                task.cancel()
+            if assets:
+                self.stream_tasks[exchange] = asyncio.create_task(self._run_stream(exchange, assets))
+
+    async def stop(self):
+        tasks = list(self.stream_tasks.values())
+        self.stream_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def drain(self) -> Dict[str, List[Dict[str, Any]]]:
+        quotes = {asset: self.tickers[asset][1] for asset in self.dirty if asset in self.tickers}
+        self.dirty.clear()
+        return self._to_rates(quotes)
+
+    # INFO: Streamed rates replace the polled ones while they are fresh, REST is the fallback when a stream is down.
+    def overlay(self, rates: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        now = time.time()
+        fresh_quotes = {
+            asset: quote for asset, (received_at, quote) in self.tickers.items()
+            if now - received_at < self.stale_seconds
+        }
+        streamed_rates = self._to_rates(fresh_quotes)
+        overlaid = {}
+        for currency, currency_rates in rates.items():
+            streamed = {rate["symbol"]: rate for rate in streamed_rates.get(currency, [])}
+            overlaid[currency] = [streamed.get(rate["symbol"], rate) for rate in currency_rates]
+        return overlaid
+
+    def _to_rates(self, quotes: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        fx_rates = self.rate_provider.fx_rates
+        if not quotes or not fx_rates:
+            return {}
+        table = RateTable(list(quotes))
+        table.load(quotes)
+        table.finalize()
+        return table.to_wire_by_currency(fx_rates, QUOTE_CURRENCIES)
+
+    def _ingest(self, asset: str, quote: Dict[str, Any], source: str):
+        if not is_valid_quote(quote):
+            self.rate_provider.quarantine({asset: {"source": source, **quote}})
+            return
+        self.tickers[asset] = (time.time(), quote)
+        self.tickers.move_to_end(asset)
+        self.dirty.add(asset)
+
+    async def _run_stream(self, exchange: str, assets: frozenset):
+        delay = 1
+        while True:
+            try:
+                if exchange == "binance":
+                    await self._consume_binance(assets)
+                else:
+                    await self._consume_kraken(assets)
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"{exchange} stream failed: {e}. Reconnecting in {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    async def _consume_binance(self, assets: frozenset):
+        streams = "/".join(f"{asset.lower()}usdt@ticker" for asset in sorted(assets))
+        symbols = {f"{asset}USDT": asset for asset in assets}
+        async with websockets.connect(f"{self.urls['binance']}?streams={streams}") as stream:
+            logger.info(f"Binance stream connected for {len(assets)} assets")
+            async for message in stream:
+                data = json.loads(message).get("data", {})
+                asset = symbols.get(data.get("s"))
+                if not asset:
+                    continue
+                try:
+                    self._ingest(asset, self.rate_provider.parse_binance_ticker(asset, {
+                        "askPrice": data["a"],
+                        "bidPrice": data["b"],
+                        "lastPrice": data["c"],
+                        "priceChangePercent": data["P"]
+                    }), "binance_stream")
+                except Exception as e:
+                    logger.warning(f"Skipping Binance stream ticker for {asset}: {e}")
+
+    # INFO: Kraken ticker messages are arrays: [channel_id, ticker, "ticker", pair].
+    async def _consume_kraken(self, assets: frozenset):
+        pairs = {f"{asset}/USD": asset for asset in assets}
+        async with websockets.connect(self.urls["kraken"]) as stream:
+            await stream.send(json.dumps({
+                "event": "subscribe",
+                "pair": sorted(pairs),
+                "subscription": {"name": "ticker"}
+            }))
+            logger.info(f"Kraken stream connected for {len(assets)} assets")
+            async for message in stream:
+                data = json.loads(message)
+                if not isinstance(data, list) or len(data) < 4 or data[2] != "ticker":
+                    continue
+                asset = pairs.get(data[3])
+                if not asset:
+                    continue
+                ticker = data[1]
+                try:
+                    self._ingest(asset, self.rate_provider.parse_kraken_ticker(asset, {
+                        "a": ticker["a"],
+                        "b": ticker["b"],
+                        "c": ticker["c"],
+                        "o": ticker["o"][0]
+                    }), "kraken_stream")
+                except Exception as e:
+                    logger.warning(f"Skipping Kraken stream ticker for {asset}: {e}")
@@ -1,9 +1,75 @@
 import asyncio
 import logging
+import time
+from collections import deque
+from src.utils.metrics import PROVIDER_REQUEST_SECONDS, PROVIDER_REQUESTS
 
 logger = logging.getLogger(__name__)
 
-# INFO: This function will try a function once and then retry a specified amount of time with an exponential backoff. 
+# INFO: Raised for failures that another attempt can not fix (e.g. a symbol the provider does not list).
+# They are not retried and do not count against the provider's circuit breaker, the provider did answer.
+class NonRetryableError(Exception):
+    pass
+
+
+# INFO: Per provider circuit breaker. After failure_threshold consecutive failures the provider is skipped right away
+# for recovery_timeout seconds, then a single trial call is let through (half open) to decide if it closes again.
+# If the trial never reports back (e.g. cancelled), another one is let through after recovery_timeout.
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow_request(self) -> bool:
+        if self.state == "closed":
+            return True
+        if time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = "half_open"
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"Circuit breaker for {self.name} closed")
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit breaker for {self.name} opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+# INFO: Sliding window of the latest attempt latencies of a provider, used to decide when to hedge.
+class LatencyTracker:
+    def __init__(self, window: int = 100, min_samples: int = 10):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, latency: float):
+        self.samples.append(latency)
+
+    def percentile(self, percentile: float) -> float | None:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * percentile), len(ordered) - 1)]
+
+
+# INFO: This function will try a function once and then retry a specified amount of time with an exponential backoff.
+# INFO: Optional resilience settings:
+# - attempt_timeout: deadline for each attempt.
+# - deadline: absolute time (time.monotonic) of the latency budget, no attempt or backoff goes past it.
+# - breaker: the call is skipped while the provider's circuit is open.
+# - latency_tracker + hedge_percentile: a second attempt is raced once the first one is slower than that percentile.
 async def retry_async_function(
     func,
     *args,
@@ -11,25 +77,102 @@ async def retry_async_function(
     initial_delay=0.1,
     max_delay=10,
     exponential_backoff_rate=2,
+    attempt_timeout=None,
+    deadline=None,
+    breaker: CircuitBreaker | None = None,
+    latency_tracker: LatencyTracker | None = None,
+    hedge_percentile=None,
     **kwargs
 ) -> list[dict[str, any]]:
 
     delay = initial_delay
+    provider = breaker.name if breaker else func.__name__
 
     for attempt in range(retries + 1):
+        timeout = attempt_timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error(f"Latency budget exhausted for the function: {func.__name__}")
+                return None
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        if breaker and not breaker.allow_request():
+            PROVIDER_REQUESTS.labels(provider, "skipped").inc()
+            logger.warning(f"Skipping {func.__name__}, circuit breaker for {breaker.name} is open")
+            return None
+
+        start = time.perf_counter()
         try:
-            return await func(*args, **kwargs)
+            result = await _attempt(func, args, kwargs, timeout, latency_tracker, hedge_percentile)
+            PROVIDER_REQUEST_SECONDS.labels(provider).observe(time.perf_counter() - start)
+            PROVIDER_REQUESTS.labels(provider, "success").inc()
+            if breaker:
+                breaker.record_success()
+            return result
+        except NonRetryableError as e:
+            PROVIDER_REQUEST_SECONDS.labels(provider).observe(time.perf_counter() - start)
+            PROVIDER_REQUESTS.labels(provider, "rejected").inc()
+            if breaker:
+                breaker.record_success()
+            logger.warning(f"{func.__name__} failed without retry, error: {str(e)}")
+            return None
         except Exception as e:
+            PROVIDER_REQUEST_SECONDS.labels(provider).observe(time.perf_counter() - start)
+            PROVIDER_REQUESTS.labels(provider, "timeout" if isinstance(e, asyncio.TimeoutError) else "error").inc()
+            if breaker:
+                breaker.record_failure()
+            error = str(e) or type(e).__name__
             if attempt == retries:
-                logger.error(f"All retries failed for the function: {func.__name__}, error: {str(e)}")
+                logger.error(f"All retries failed for the function: {func.__name__}, error: {error}")
                 return None
 
             delay = min(delay * exponential_backoff_rate, max_delay)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                logger.error(f"No latency budget left to retry the function: {func.__name__}, error: {error}")
+                return None
 
             logger.warning(
-                f"{func.__name__} failed (attempt {attempt + 1}/{retries + 1}), error: {str(e)}. "
+                f"{func.__name__} failed (attempt {attempt + 1}/{retries + 1}), error: {error}. "
                 f"Retrying in {delay:.2f}s"
             )
             await asyncio.sleep(delay)
 
-    return None
\ No newline at end of file
+    return None
+
+
+async def _attempt(func, args, kwargs, timeout, latency_tracker, hedge_percentile):
+    start = time.monotonic()
+    hedge_after = latency_tracker.percentile(hedge_percentile) if latency_tracker and hedge_percentile else None
+
+    if hedge_after is None or (timeout is not None and hedge_after >= timeout):
+        result = await asyncio.wait_for(func(*args, **kwargs), timeout)
+    else:
+        result = await asyncio.wait_for(_hedged(func, args, kwargs, hedge_after), timeout)
+
+    if latency_tracker:
+        latency_tracker.record(time.monotonic() - start)
+    return result
+
+
+# INFO: Returns the first of the two attempts that succeeds, the other one is cancelled.
+async def _hedged(func, args, kwargs, hedge_after):
+    tasks = [asyncio.create_task(func(*args, **kwargs))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            logger.info(f"Hedging {func.__name__} after {hedge_after:.3f}s")
+            tasks.append(asyncio.create_task(func(*args, **kwargs)))
+
+        error = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -1,24 +1,67 @@
 import aiohttp
 import logging
+from typing import Dict, List
 from src.cache.redis_cache import RedisCache
+from src.config.constants import KRAKEN_API_URL
 
 logger = logging.getLogger(__name__)
-# TODO: Make this more generic, we could use this for other currencies. 
-async def fetch_usd_cad_rate(session: aiohttp.ClientSession, redis_cache: RedisCache = None) -> float:
+
+# INFO: Kraken pair of each quote currency, its key in the response and whether the pair is quoted per unit of the
+# currency (EUR/USD) instead of per USD (USD/CAD). The matrix always holds the amount of the currency for one USD.
+FX_PAIRS = {
+    "CAD": ("USDCAD", "ZUSDZCAD", False),
+    "EUR": ("EURUSD", "ZEURZUSD", True),
+    "GBP": ("GBPUSD", "ZGBPZUSD", True),
+    "JPY": ("USDJPY", "ZUSDZJPY", False),
+    "CHF": ("USDCHF", "USDCHF", False),
+    "AUD": ("AUDUSD", "AUDUSD", True),
+}
+FALLBACK_FX_RATES = {"USD": 1.0, "CAD": 1.35}
+
+# INFO: Fetches the FX rates of all the quote currencies in one Kraken request and caches them as one entry.
+# INFO: The cached rates can be passed in when the caller already read them together with other keys.
+# INFO: Without fallback the errors are raised instead of returning the fallback rates (used by the refresh-ahead).
+async def fetch_fx_rates(
+    session: aiohttp.ClientSession,
+    currencies: List[str],
+    redis_cache: RedisCache = None,
+    cached_rates: Dict[str, float] = None,
+    fallback: bool = True
+) -> Dict[str, float]:
     try:
         if redis_cache:
-            cached_rate = await redis_cache.get("usd_cad_rate")
-            if cached_rate:
-                logger.info("Using cached USD/CAD rate")
-                return float(cached_rate)
+            if cached_rates is None:
+                cached_rates = await redis_cache.get("fx_rates")
+            if cached_rates and all(currency in cached_rates for currency in currencies):
+                logger.info("Using cached FX rates")
+                return cached_rates
+
+        pairs = {currency: FX_PAIRS[currency] for currency in currencies if currency in FX_PAIRS}
+        unknown = [currency for currency in currencies if currency not in FX_PAIRS and currency != "USD"]
+        if unknown:
+            logger.warning(f"No FX pair known for the quote currencies: {unknown}")
 
-        async with session.get('https://api.kraken.com/0/public/Ticker?pair=USDCAD') as response:
-            if response.status == 200:
+        rates = {"USD": 1.0}
+        if pairs:
+            query = ",".join(pair for pair, _, _ in pairs.values())
+            async with session.get(KRAKEN_API_URL, params={"pair": query}) as response:
+                if response.status != 200:
+                    raise Exception(f"Kraken FX API failed with status code: {response.status}")
                 data = await response.json()
-                rate = float(data["result"]["ZUSDZCAD"]["c"][0])
-                if redis_cache:
-                    await redis_cache.set("usd_cad_rate", rate)
-                return rate
+                result = data.get("result", {})
+                for currency, (pair, key, inverted) in pairs.items():
+                    ticker = result.get(key) or result.get(pair)
+                    if ticker is None:
+                        logger.warning(f"Kraken returned no FX rate for {pair}")
+                        continue
+                    rate = float(ticker["c"][0])
+                    rates[currency] = 1 / rate if inverted else rate
+
+        if redis_cache:
+            await redis_cache.set("fx_rates", rates)
+        return rates
     except Exception as e:
-        logger.error(f"Error fetching USD/CAD rate: {e}")
-    return 1.35
\ No newline at end of file
+        logger.error(f"Error fetching FX rates: {e}")
+        if not fallback:
+            raise
+    return {currency: rate for currency, rate in FALLBACK_FX_RATES.items() if currency in currencies or currency == "USD"}
\ No newline at end of file
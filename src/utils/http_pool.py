@@ -0,0 +1,117 @@
+import logging
+from types import SimpleNamespace
+from typing import Dict
+from urllib.parse import urlparse
+import aiohttp
+from src.config.constants import (
+    NEWTON_API_URL, BINANCE_API_URL, KRAKEN_API_URL,
+    HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+)
+from src.utils.metrics import (
+    HTTP_POOL_REQUESTS, HTTP_POOL_IN_FLIGHT, HTTP_POOL_ERRORS,
+    HTTP_POOL_CONNECTIONS_CREATED, HTTP_POOL_CONNECTIONS_REUSED
+)
+
+logger = logging.getLogger(__name__)
+
+# INFO: Maps the upstream hosts to a provider name so the pool usage can be reported per provider.
+PROVIDER_HOSTS = {
+    urlparse(NEWTON_API_URL).hostname: "newton",
+    urlparse(BINANCE_API_URL).hostname: "binance",
+    urlparse(KRAKEN_API_URL).hostname: "kraken",
+}
+
+# INFO: Metric of each field of the pool stats, counters for the totals and a gauge for the requests in flight.
+POOL_METRICS = {
+    "requests": HTTP_POOL_REQUESTS,
+    "in_flight": HTTP_POOL_IN_FLIGHT,
+    "errors": HTTP_POOL_ERRORS,
+    "connections_created": HTTP_POOL_CONNECTIONS_CREATED,
+    "connections_reused": HTTP_POOL_CONNECTIONS_REUSED,
+}
+
+# INFO: One session and connector for the whole process, so the keep-alive connections, the DNS cache
+# and the TLS sessions are reused across update cycles instead of paying the handshakes on every fetch.
+class HttpClientPool:
+    def __init__(
+        self,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache: int = HTTP_DNS_CACHE_TTL,
+        keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+        self.session: aiohttp.ClientSession | None = None
+        self.provider_stats: Dict[str, Dict[str, int]] = {}
+
+    async def open(self) -> aiohttp.ClientSession:
+        if self.session and not self.session.closed:
+            return self.session
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.ttl_dns_cache,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            trace_configs=[self._build_trace_config()]
+        )
+        logger.info(f"HTTP pool opened (limit={self.limit}, limit_per_host={self.limit_per_host})")
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {provider: dict(stats) for provider, stats in self.provider_stats.items()}
+
+    def _provider_for(self, url) -> str:
+        return PROVIDER_HOSTS.get(url.host, url.host)
+
+    def _count(self, provider: str, field: str, amount: int = 1):
+        stats = self.provider_stats.setdefault(provider, dict.fromkeys(POOL_METRICS, 0))
+        stats[field] += amount
+        POOL_METRICS[field].labels(provider).inc(amount)
+
+    # INFO: aiohttp trace hooks share a context per request, the provider is resolved once on request start
+    # and reused by the connection hooks that do not carry the URL.
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx: SimpleNamespace, params):
+            ctx.provider = self._provider_for(params.url)
+            self._count(ctx.provider, "requests")
+            self._count(ctx.provider, "in_flight")
+
+        async def on_request_end(session, ctx: SimpleNamespace, params):
+            self._count(ctx.provider, "in_flight", -1)
+
+        async def on_request_exception(session, ctx: SimpleNamespace, params):
+            self._count(ctx.provider, "in_flight", -1)
+            self._count(ctx.provider, "errors")
+
+        async def on_connection_create_end(session, ctx: SimpleNamespace, params):
+            self._count(ctx.provider, "connections_created")
+
+        async def on_connection_reuseconn(session, ctx: SimpleNamespace, params):
+            self._count(ctx.provider, "connections_reused")
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
@@ -0,0 +1,133 @@
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# INFO: Prometheus metrics of the hot path, served in the text format on /metrics by the websocket server.
+# INFO: Observing a histogram or incrementing a counter is a lock and an add, so they stay on in production.
+# Values that are only needed when scraped (e.g. the connected clients) are gauges computed on scrape.
+
+# INFO: Buckets from 0.5ms to 10s, the upstream calls and the in-process stages share them.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PROVIDER_REQUEST_SECONDS = Histogram(
+    "rates_provider_request_seconds",
+    "Duration of each attempt to an upstream provider",
+    ["provider"],
+    buckets=LATENCY_BUCKETS
+)
+PROVIDER_REQUESTS = Counter(
+    "rates_provider_requests_total",
+    "Attempts to an upstream provider by outcome (success, error, timeout, rejected, skipped)",
+    ["provider", "outcome"]
+)
+FETCH_CYCLE_SECONDS = Histogram(
+    "rates_fetch_cycle_seconds",
+    "Duration of the stages of a fetch cycle",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+CACHE_OPERATION_SECONDS = Histogram(
+    "rates_cache_operation_seconds",
+    "Duration of the cache reads and writes",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+CACHE_REFRESHES = Counter(
+    "rates_cache_refreshes_total",
+    "Background refreshes of the cache entries by source and outcome (success, failed)",
+    ["source", "outcome"]
+)
+CACHE_LOOKUPS = Counter(
+    "rates_cache_lookups_total",
+    "Cache lookups by tier (l1, l2) and result (hit, miss)",
+    ["tier", "result"]
+)
+VALIDATION_SECONDS = Histogram(
+    "rates_validation_seconds",
+    "Duration of the validation of the quotes ingested in a fetch cycle",
+    buckets=LATENCY_BUCKETS
+)
+INVALID_RATES = Counter(
+    "rates_invalid_total",
+    "Quotes quarantined because they failed validation, by source",
+    ["source"]
+)
+SERIALIZATION_SECONDS = Histogram(
+    "rates_serialization_seconds",
+    "Duration of the encoding of a frame",
+    ["wire_format"],
+    buckets=LATENCY_BUCKETS
+)
+BROADCAST_SECONDS = Histogram(
+    "rates_broadcast_seconds",
+    "Duration of the fan-out of a snapshot to the connected clients",
+    buckets=LATENCY_BUCKETS
+)
+FRAMES_SENT = Counter(
+    "rates_frames_sent_total",
+    "Frames written to the clients",
+    ["wire_format"]
+)
+FRAME_BYTES_SENT = Counter(
+    "rates_frame_bytes_sent_total",
+    "Payload bytes written to the clients, before compression",
+    ["wire_format"]
+)
+HTTP_SNAPSHOT_REQUESTS = Counter(
+    "rates_http_snapshot_requests_total",
+    "Requests to the HTTP snapshot endpoint by status code",
+    ["status"]
+)
+HTTP_POOL_REQUESTS = Counter(
+    "rates_http_pool_requests_total",
+    "Requests sent through the shared HTTP pool",
+    ["provider"]
+)
+HTTP_POOL_IN_FLIGHT = Gauge(
+    "rates_http_pool_in_flight",
+    "Requests of the shared HTTP pool waiting for a response",
+    ["provider"]
+)
+HTTP_POOL_ERRORS = Counter(
+    "rates_http_pool_errors_total",
+    "Requests of the shared HTTP pool that raised",
+    ["provider"]
+)
+HTTP_POOL_CONNECTIONS_CREATED = Counter(
+    "rates_http_pool_connections_created_total",
+    "Connections opened by the shared HTTP pool",
+    ["provider"]
+)
+HTTP_POOL_CONNECTIONS_REUSED = Counter(
+    "rates_http_pool_connections_reused_total",
+    "Keep-alive connections reused by the shared HTTP pool",
+    ["provider"]
+)
+CONNECTED_CLIENTS = Gauge(
+    "rates_connected_clients",
+    "Connected websocket clients"
+)
+CLIENT_SEND_BUFFER_BYTES = Histogram(
+    "rates_client_send_buffer_bytes",
+    "Outbound buffer size of each client when a tick is broadcast",
+    buckets=(0, 1024, 4096, 16384, 65536, 262144, 1048576)
+)
+SLOW_CLIENT_EVENTS = Counter(
+    "rates_slow_client_events_total",
+    "Updates skipped for slow clients and slow clients disconnected",
+    ["event"]
+)
+
+
+@contextmanager
+def timed(histogram: Histogram):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start)
+
+
+def metrics_response():
+    return HTTPStatus.OK, [("Content-Type", CONTENT_TYPE_LATEST)], generate_latest()
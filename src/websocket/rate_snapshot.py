@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import List, Dict, Any, Tuple
+from src.cache.last_snapshot import LastSnapshot
+from src.config.constants import DEFAULT_QUOTE_CURRENCY
+from src.history.rate_history import RateHistory
+from src.providers.rate_provider import RateProvider
+from src.providers.stream_ingestor import StreamIngestor
+from src.utils.metrics import SERIALIZATION_SECONDS, timed
+from src.websocket.wire_formats import WIRE_FORMATS
+
+logger = logging.getLogger(__name__)
+
+# INFO: Immutable view of one fetch cycle, with the rates of every quote currency. The rates were validated when they
+# were ingested, so serving a subscriber is just a send of an already encoded string.
+# INFO: Updates only carry the rates that changed since the previous snapshot, clients detect a gap when the
+# sequence does not follow their last one and ask for a resync.
+# INFO: Frames are encoded lazily, once per wire format, quote currency and distinct set of symbols, and then reused
+# by every client with the same subscription.
+# INFO: A warm snapshot is the persisted one served on boot, all its rates are flagged as stale.
+# INFO: The epoch identifies the boot of the process that numbered the snapshot, the sequence alone can repeat after a
+# restart (see RateSnapshotStore.warm_start). Empty for the cluster snapshots, numbered by the leader in Redis.
+class RateSnapshot:
+    def __init__(
+        self,
+        rates: Dict[str, List[Dict[str, Any]]],
+        sequence: int,
+        previous: "RateSnapshot | None" = None,
+        warm: bool = False,
+        epoch: str = ""
+    ):
+        self.rates = rates
+        self.sequence = sequence
+        self.warm = warm
+        self.epoch = epoch
+        self.timestamp = time.time()
+        self.rates_by_symbol = {
+            currency: {rate["symbol"]: rate for rate in currency_rates}
+            for currency, currency_rates in rates.items()
+        }
+
+        self.changed_rates: Dict[str, List[Dict[str, Any]]] = {}
+        for currency, currency_rates in rates.items():
+            previous_rates = previous.rates_by_symbol.get(currency) if previous else None
+            if previous_rates is None:
+                self.changed_rates[currency] = currency_rates
+            else:
+                self.changed_rates[currency] = [
+                    rate for rate in currency_rates
+                    if previous_rates.get(rate["symbol"]) != rate
+                ]
+
+        self._data_frames: Dict[Tuple[str, str, frozenset | None], str | bytes] = {}
+        self._update_frames: Dict[Tuple[str, str, frozenset | None], str | bytes] = {}
+
+    def data_frame_for(
+        self,
+        currency: str = DEFAULT_QUOTE_CURRENCY,
+        symbols: frozenset | None = None,
+        wire_format: str = "json"
+    ) -> str | bytes:
+        key = (wire_format, currency, symbols)
+        frame = self._data_frames.get(key)
+        if frame is None:
+            response = self._build_response("data", self._filter(self.rates.get(currency, []), symbols))
+            with timed(SERIALIZATION_SECONDS.labels(wire_format)):
+                frame = WIRE_FORMATS[wire_format](response)
+            self._data_frames[key] = frame
+        return frame
+
+    def update_frame_for(
+        self,
+        currency: str = DEFAULT_QUOTE_CURRENCY,
+        symbols: frozenset | None = None,
+        wire_format: str = "json"
+    ) -> str | bytes:
+        key = (wire_format, currency, symbols)
+        frame = self._update_frames.get(key)
+        if frame is None:
+            response = self._build_response("update", self._filter(self.changed_rates.get(currency, []), symbols))
+            with timed(SERIALIZATION_SECONDS.labels(wire_format)):
+                frame = WIRE_FORMATS[wire_format](response)
+            self._update_frames[key] = frame
+        return frame
+
+    def _filter(self, rates: List[Dict[str, Any]], symbols: frozenset | None) -> List[Dict[str, Any]]:
+        if symbols is None:
+            return rates
+        return [rate for rate in rates if rate["symbol"] in symbols]
+
+    def _build_response(self, event: str, rates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "channel": "rates",
+            "event": event,
+            "seq": self.sequence,
+            "data": rates
+        }
+
+
+# INFO: Holds the latest snapshot produced by the update loop.
+# INFO: Refreshes are single-flight, concurrent callers await the same in-progress fetch instead of starting their own.
+# INFO: The rates of every fetch cycle (ours or the leader's) are recorded in the history, the streamed ones are not.
+# INFO: Without a rate service (worker processes, cluster nodes) the snapshots only come through apply, a refresh waits
+# for the next.
+# INFO: With a last_snapshot every live snapshot is persisted in the background, warm_start serves it again on boot.
+class RateSnapshotStore:
+    def __init__(
+        self,
+        rate_service: RateProvider | None,
+        ingestor: StreamIngestor | None = None,
+        history: RateHistory | None = None,
+        last_snapshot: LastSnapshot | None = None
+    ):
+        self.rate_service = rate_service
+        self.ingestor = ingestor
+        self.history = history
+        self.last_snapshot = last_snapshot
+        self._save_task: asyncio.Task | None = None
+        self.latest: RateSnapshot | None = None
+        self.sequence = 0
+        self.epoch = uuid.uuid4().hex[:8]
+        self._refresh_task: asyncio.Task | None = None
+        self._applied = asyncio.Event()
+
+    async def refresh(self) -> RateSnapshot | None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        # INFO: Shield so a caller disconnecting mid-refresh does not cancel the fetch for everyone else.
+        return await asyncio.shield(self._refresh_task)
+
+    async def get(self) -> RateSnapshot | None:
+        if self.latest:
+            return self.latest
+        return await self.refresh()
+
+    # INFO: Used in cluster mode, the snapshots come from the leader with their version, out of order ones are ignored.
+    # INFO: Also used by the workers, with the epoch of the fetcher.
+    def apply(
+        self,
+        rates: Dict[str, List[Dict[str, Any]]],
+        sequence: int,
+        warm: bool = False,
+        epoch: str = ""
+    ) -> RateSnapshot | None:
+        if not rates or sequence <= self.sequence:
+            return None
+
+        self.sequence = sequence
+        self.latest = RateSnapshot(rates, sequence, self.latest, warm, epoch)
+        if not warm:
+            self._record(rates)
+        self._applied.set()
+        return self.latest
+
+    # INFO: Used by the streaming ingestion, the streamed rates replace their symbols in the latest snapshot.
+    def merge(self, rates: Dict[str, List[Dict[str, Any]]]) -> RateSnapshot | None:
+        if not self.latest or not rates:
+            return None
+
+        merged_rates = {}
+        for currency, latest_rates in self.latest.rates_by_symbol.items():
+            merged = dict(latest_rates)
+            merged.update({rate["symbol"]: rate for rate in rates.get(currency, [])})
+            merged_rates[currency] = list(merged.values())
+        self.sequence += 1
+        self.latest = RateSnapshot(merged_rates, self.sequence, self.latest, epoch=self.epoch)
+        return self.latest
+
+    async def _refresh(self) -> RateSnapshot | None:
+        if self.rate_service is None:
+            self._applied.clear()
+            await self._applied.wait()
+            return self.latest
+
+        rates = await self.rate_service.fetch_all_rates()
+        if not rates:
+            logger.warning("Rate refresh returned no data, keeping the previous snapshot")
+            return None
+        self._record(rates)
+
+        if self.ingestor:
+            self.ingestor.sync_assets()
+            rates = self.ingestor.overlay(rates)
+
+        self.sequence += 1
+        self.latest = RateSnapshot(rates, self.sequence, self.latest, epoch=self.epoch)
+        self._save(self.latest)
+        return self.latest
+
+    # INFO: Loads the persisted snapshot, only if nothing live is there yet. The sequence goes on from the persisted
+    # one, the snapshots numbered after it (streamed merges, skipped saves) were not persisted so the sequence can
+    # repeat one already sent before the restart, the new epoch tells them apart. The FX rates and the asset sources
+    # are restored for the streaming ingestor, the routes are already persisted by the router. The USD rates seed the
+    # last known good rates, so the live snapshots stay complete when a provider fails right after the restart.
+    # INFO: A persisted state that does not have the expected shape is logged and ignored, it is a cold start.
+    async def warm_start(self) -> RateSnapshot | None:
+        if not self.last_snapshot:
+            return None
+        state = await self.last_snapshot.load()
+        if not state or self.latest:
+            return None
+
+        try:
+            rates = {
+                currency: [{**rate, "stale": True} for rate in currency_rates]
+                for currency, currency_rates in state["data"].items()
+            }
+            sequence = int(state["sequence"])
+            timestamp = float(state["timestamp"])
+            snapshot = RateSnapshot(rates, max(self.sequence, sequence), warm=True, epoch=self.epoch)
+            if self.rate_service:
+                asset_sources = state.get("asset_sources") or {}
+                router = self.rate_service.router
+                self.rate_service.last_good.seed(
+                    state["data"].get("USD", []),
+                    lambda asset: asset_sources.get(asset) or router.provider_for(asset),
+                    timestamp
+                )
+        except Exception as e:
+            logger.error(f"Ignoring the persisted snapshot, cold start: {e!r}")
+            return None
+
+        if self.rate_service:
+            self.rate_service.fx_rates = self.rate_service.fx_rates or state.get("fx_rates", {})
+            self.rate_service.asset_sources = self.rate_service.asset_sources or state.get("asset_sources", {})
+        self.sequence = snapshot.sequence
+        self.latest = snapshot
+        logger.info(f"Warm start from the snapshot {sequence} of {time.time() - timestamp:.0f}s ago")
+        return self.latest
+
+    # INFO: A save still in progress is not queued behind, the next tick saves again.
+    def _save(self, snapshot: RateSnapshot):
+        if not self.last_snapshot:
+            return
+        if self._save_task and not self._save_task.done():
+            return
+        state = {
+            "sequence": snapshot.sequence,
+            "timestamp": snapshot.timestamp,
+            "data": snapshot.rates,
+            "fx_rates": self.rate_service.fx_rates,
+            "asset_sources": self.rate_service.asset_sources
+        }
+        self._save_task = asyncio.create_task(self.last_snapshot.save(state))
+
+    def _record(self, rates: Dict[str, List[Dict[str, Any]]]):
+        if not self.history:
+            return
+        try:
+            self.history.record(time.time(), rates)
+        except Exception as e:
+            logger.error(f"Error recording the rate history: {e}")
@@ -1,61 +1,303 @@
 import json
 import logging
-from typing import Dict, Any
+import time
+from http import HTTPStatus
+from typing import Dict, Any, Set, List, Tuple
+from urllib.parse import parse_qs, urlsplit
 import websockets
+from src.config.constants import (
+    CLIENT_WRITE_BUFFER_LIMIT, CLIENT_MAX_DROPPED_FRAMES, STREAM_MIN_INTERVAL, QUOTE_CURRENCIES, DEFAULT_QUOTE_CURRENCY
+)
 from src.providers.rate_provider import RateProvider
+from src.providers.stream_ingestor import StreamIngestor
+from src.cache.last_snapshot import LastSnapshot
+from src.cluster.cluster_coordinator import ClusterCoordinator
+from src.history.rate_history import RateHistory
 import asyncio
-from src.utils.validation import validate_response
+from src.utils.metrics import (
+    BROADCAST_SECONDS, CLIENT_SEND_BUFFER_BYTES, CONNECTED_CLIENTS, FRAME_BYTES_SENT, FRAMES_SENT, HTTP_SNAPSHOT_REQUESTS,
+    SLOW_CLIENT_EVENTS, metrics_response, timed
+)
+from src.websocket.rate_snapshot import RateSnapshot, RateSnapshotStore
+from src.websocket.wire_formats import CONTENT_TYPES, WIRE_FORMATS, encode_json, format_for_subprotocol
+from src.workers.worker_pool import WorkerFeed, WorkerPool
 
 logger = logging.getLogger(__name__)
 
+
+# INFO: Quote currency of a subscribe message or an HTTP query, case-insensitive. None when it is not a string or not
+# a supported currency.
+def normalize_currency(currency: Any) -> str | None:
+    if not isinstance(currency, str):
+        return None
+    currency = currency.upper()
+    return currency if currency in QUOTE_CURRENCIES else None
+
+# INFO: In worker mode the fetcher runs this handler without a server and hands its snapshots to the worker_pool,
+# the workers run it without a rate service and get their snapshots from the feed.
 class RateWebSocketHandler:
-    def __init__(self, rate_service: RateProvider, update_interval: float = 10.0):
+    def __init__(
+        self,
+        rate_service: RateProvider | None,
+        update_interval: float = 10.0,
+        cluster: ClusterCoordinator | None = None,
+        ingestor: StreamIngestor | None = None,
+        stream_interval: float = STREAM_MIN_INTERVAL,
+        history: RateHistory | None = None,
+        worker_pool: WorkerPool | None = None,
+        feed: WorkerFeed | None = None,
+        last_snapshot: LastSnapshot | None = None
+    ):
         self.rate_service = rate_service
+        self.cluster = cluster
+        self.ingestor = ingestor
+        self.stream_interval = stream_interval
+        self.history = history
+        self.worker_pool = worker_pool
+        self.feed = feed
+        # INFO: Cluster nodes only fetch in _cluster_rate_update (the leader), an on-demand refresh waits for the next
+        # snapshot from the channel like a worker does, so the upstream load does not grow with the node count.
+        self.snapshot_store = RateSnapshotStore(None if cluster else rate_service, ingestor, history, last_snapshot)
         self.update_interval = update_interval
         self.connected_clients: Set[websockets.WebSocketServerProtocol] = set()
+        self.dropped_frames: Dict[websockets.WebSocketServerProtocol, int] = {}
+        # INFO: Quote currency, symbols (None means all of them) and wire format each client subscribed with.
+        self.subscriptions: Dict[websockets.WebSocketServerProtocol, Tuple[str, frozenset | None, str]] = {}
         self.cron_task = None
+        self.cluster_task = None
+        self.stream_task = None
+        self.feed_task = None
+        # INFO: Background tasks (slow client disconnects) are referenced until they finish, so they are not collected.
+        self.background_tasks: Set[asyncio.Task] = set()
+        CONNECTED_CLIENTS.set_function(lambda: len(self.connected_clients))
 
     # INFO: Start the crong job as a non-blocking function/separate coroutine.
+    # INFO: The persisted snapshot (if any) is loaded first, so the clients are served right away while the first live
+    # cycle runs in the background.
     async def start_updates(self):
+        if self.feed:
+            self.feed_task = asyncio.create_task(self.feed.listen(self._on_snapshot_message))
+            return
+        snapshot = await self.snapshot_store.warm_start()
+        if snapshot and self.worker_pool:
+            self.worker_pool.publish(snapshot)
         self.cron_task = asyncio.create_task(self._cron_rate_update())
+        if self.cluster:
+            self.cluster_task = asyncio.create_task(self.cluster.listen(self._on_snapshot_message))
+        if self.ingestor:
+            self.stream_task = asyncio.create_task(self._stream_rate_update())
 
     async def stop_updates(self):
-        if self.cron_task:
-            self.cron_task.cancel()
-            try:
-                await self.cron_task
-            except asyncio.CancelledError:
-                pass
+        for task in (self.cron_task, self.cluster_task, self.stream_task, self.feed_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self.cluster:
+            await self.cluster.close()
+        if self.ingestor:
+            await self.ingestor.stop()
+        if self.feed:
+            await self.feed.close()
+        if self.history:
+            self.history.close()
     # INFO: This is the cron job that will push the rates to the clients at a given interval.
     # INFO: Private function to be called by the start_updates.
     async def _cron_rate_update(self):
         while True:
             try:
-                rates = await self.rate_service.fetch_all_rates()
-                if rates:
-                    response = {
-                        "channel": "rates",
-                        "event": "update",
-                        "data": rates
-                    }
-                    await self.broadcast(response)
+                if self.cluster:
+                    await self._cluster_rate_update()
+                else:
+                    snapshot = await self.snapshot_store.refresh()
+                    if snapshot:
+                        await self.broadcast_snapshot(snapshot)
                 await asyncio.sleep(self.update_interval)
             except Exception as e:
                 logger.error(f"Error in periodic updates: {e}")
                 await asyncio.sleep(1) 
 
-    async def broadcast(self, message: Dict):
-        disconnected_clients = set()
-        for client in self.connected_clients:
+    # INFO: Pushes the streamed rates that changed, conflated to at most one update per stream interval.
+    async def _stream_rate_update(self):
+        while True:
             try:
-                await client.send(json.dumps(message))
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.add(client)
+                await asyncio.sleep(self.stream_interval)
+                snapshot = self.snapshot_store.merge(self.ingestor.drain())
+                if snapshot:
+                    await self.broadcast_snapshot(snapshot)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Error broadcasting to client: {e}")
-                disconnected_clients.add(client)
-        
-        self.connected_clients -= disconnected_clients
+                logger.error(f"Error in streamed updates: {e}")
+
+    # INFO: In cluster mode only the leader fetches, every node (the leader included) broadcasts what it receives
+    # from the snapshot channel, so all the clients see the same versioned snapshot.
+    async def _cluster_rate_update(self):
+        if not await self.cluster.ensure_leadership():
+            return
+        rates = await self.rate_service.fetch_all_rates()
+        if rates:
+            await self.cluster.publish_snapshot(rates)
+
+    # INFO: Snapshots of the cluster leader, or of the fetcher in a worker process.
+    async def _on_snapshot_message(self, message: Dict[str, Any]):
+        snapshot = self.snapshot_store.apply(
+            message["data"],
+            message["sequence"],
+            message.get("warm", False),
+            message.get("epoch", "")
+        )
+        if snapshot:
+            await self.broadcast_snapshot(snapshot)
+
+    # INFO: The same frame is written to every client without awaiting each send, so one slow socket does not hold up
+    # the others. websockets.broadcast has no backpressure, so we apply our own slow consumer policy on top of it.
+    # INFO: Clients are grouped by their subscription, each group gets its delta encoded once.
+    # INFO: The update is sent even when nothing changed for a group, so the sequence stays contiguous for gap detection.
+    async def broadcast_snapshot(self, snapshot: RateSnapshot):
+        if self.worker_pool:
+            self.worker_pool.publish(snapshot)
+        with timed(BROADCAST_SECONDS):
+            groups: Dict[Tuple[str, frozenset | None, str], List[websockets.WebSocketServerProtocol]] = {}
+            for client in self._collect_ready_clients():
+                groups.setdefault(self.subscription_for(client), []).append(client)
+
+            for (currency, symbols, wire_format), clients in groups.items():
+                frame = snapshot.update_frame_for(currency, symbols, wire_format)
+                websockets.broadcast(clients, frame)
+                self._count_frames(wire_format, frame, len(clients))
+
+    def _count_frames(self, wire_format: str, frame: str | bytes, clients: int = 1):
+        FRAMES_SENT.labels(wire_format).inc(clients)
+        FRAME_BYTES_SENT.labels(wire_format).inc(len(frame) * clients)
+
+    # INFO: Plain HTTP requests on the websocket port (websockets process_request hook), returning None goes on with
+    # the websocket handshake.
+    async def process_request(self, path: str, request_headers: websockets.Headers):
+        url = urlsplit(path)
+        if url.path == "/metrics":
+            return metrics_response()
+        if url.path == "/rates":
+            response = await self.snapshot_response(parse_qs(url.query), request_headers)
+            HTTP_SNAPSHOT_REQUESTS.labels(int(response[0])).inc()
+            return response
+        return None
+
+    # INFO: GET /rates?currency=EUR&symbols=BTC_EUR,ETH_EUR&format=json, the same frame a subscriber gets as its first
+    # message, served from the latest snapshot without any fetch.
+    # INFO: The ETag is the snapshot epoch and sequence, which are the same on every node and worker and never repeat
+    # for different rates, the epoch changes on every restart of the process that numbers the snapshots. A CDN or proxy
+    # can revalidate with If-None-Match and get a 304 until the next tick. max-age is the time left until the next tick.
+    async def snapshot_response(self, query: Dict[str, List[str]], request_headers: websockets.Headers):
+        currency = normalize_currency(query.get("currency", [DEFAULT_QUOTE_CURRENCY])[-1])
+        wire_format = query.get("format", ["json"])[-1]
+        symbols = query.get("symbols", [None])[-1]
+        if currency is None:
+            return self._http_error(
+                HTTPStatus.BAD_REQUEST,
+                f"Unsupported quote currency, expected one of: {', '.join(QUOTE_CURRENCIES)}"
+            )
+        if wire_format not in WIRE_FORMATS:
+            return self._http_error(HTTPStatus.BAD_REQUEST, f"Unsupported format, expected one of: {', '.join(WIRE_FORMATS)}")
+
+        snapshot = await self.snapshot_store.get()
+        if not snapshot or currency not in snapshot.rates:
+            return self._http_error(HTTPStatus.SERVICE_UNAVAILABLE, f"No rates available in {currency} yet")
+
+        etag = f'"{snapshot.epoch}-{snapshot.sequence}"' if snapshot.epoch else f'"{snapshot.sequence}"'
+        max_age = max(int(snapshot.timestamp + self.update_interval - time.time()), 0)
+        headers = [("ETag", etag), ("Cache-Control", f"public, max-age={max_age}")]
+        if_none_match = request_headers.get("If-None-Match")
+        if if_none_match and (
+            if_none_match.strip() == "*"
+            or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        ):
+            return HTTPStatus.NOT_MODIFIED, headers, b""
+
+        frame = snapshot.data_frame_for(
+            currency,
+            frozenset(symbol for symbol in symbols.split(",") if symbol) if symbols is not None else None,
+            wire_format
+        )
+        self._count_frames(wire_format, frame)
+        body = frame.encode() if isinstance(frame, str) else frame
+        return HTTPStatus.OK, headers + [("Content-Type", CONTENT_TYPES[wire_format])], body
+
+    def _http_error(self, status: HTTPStatus, message: str):
+        body = encode_json({"channel": "rates", "event": "error", "message": message}).encode()
+        return status, [("Content-Type", "application/json"), ("Cache-Control", "no-store")], body
+
+    # INFO: Answers a history request, the raw samples of a symbol or its candles when a resolution is given.
+    # The range defaults to the last hour, invalid requests raise a ValueError with the message for the client.
+    def history_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.history:
+            raise ValueError("History is not enabled")
+
+        symbol = data.get("symbol")
+        end = data.get("to", time.time())
+        start = data.get("from", end - 3600)
+        resolution = data.get("resolution")
+        if not isinstance(symbol, str):
+            raise ValueError("Symbol must be a string")
+        if any(isinstance(value, bool) or not isinstance(value, (int, float)) for value in (start, end)):
+            raise ValueError("From and to must be unix timestamps")
+        if resolution is not None and (isinstance(resolution, bool) or not isinstance(resolution, int)):
+            raise ValueError("Resolution must be a number of seconds")
+
+        if resolution is None:
+            points = self.history.history(symbol, start, end)
+        else:
+            points = self.history.candles_for(symbol, resolution, start, end)
+        return {
+            "channel": "rates",
+            "event": "history",
+            "symbol": symbol,
+            "resolution": resolution,
+            "data": points
+        }
+
+    # INFO: Clients that did not subscribe yet get all the symbols in CAD, in the format of their subprotocol.
+    def subscription_for(self, client: websockets.WebSocketServerProtocol) -> Tuple[str, frozenset | None, str]:
+        subscription = self.subscriptions.get(client)
+        if subscription is None:
+            return DEFAULT_QUOTE_CURRENCY, None, format_for_subprotocol(client.subprotocol)
+        return subscription
+
+    # INFO: Clients with a full outbound buffer skip this tick, the next update supersedes the dropped one anyway.
+    # Clients that keep falling behind are disconnected.
+    def _collect_ready_clients(self) -> List[websockets.WebSocketServerProtocol]:
+        ready_clients = []
+        for client in self.connected_clients:
+            transport = client.transport
+            buffer_size = transport.get_write_buffer_size() if transport else 0
+            CLIENT_SEND_BUFFER_BYTES.observe(buffer_size)
+            if buffer_size <= CLIENT_WRITE_BUFFER_LIMIT:
+                self.dropped_frames.pop(client, None)
+                ready_clients.append(client)
+                continue
+
+            SLOW_CLIENT_EVENTS.labels("skipped").inc()
+            dropped = self.dropped_frames.get(client, 0) + 1
+            self.dropped_frames[client] = dropped
+            logger.warning(f"Dropped update for slow client {client.remote_address} ({dropped}/{CLIENT_MAX_DROPPED_FRAMES})")
+            if dropped >= CLIENT_MAX_DROPPED_FRAMES:
+                task = asyncio.create_task(self._disconnect_slow_client(client))
+                self.background_tasks.add(task)
+                task.add_done_callback(self.background_tasks.discard)
+        return ready_clients
+
+    async def _disconnect_slow_client(self, client: websockets.WebSocketServerProtocol):
+        SLOW_CLIENT_EVENTS.labels("disconnected").inc()
+        self.connected_clients.discard(client)
+        self.dropped_frames.pop(client, None)
+        self.subscriptions.pop(client, None)
+        try:
+            await client.close(1013, "Client too slow")
+        except Exception as e:
+            logger.error(f"Error disconnecting slow client: {e}")
+
     # INFO: This is the entry point for the client connection to the websocket. 
     async def handle_message(self, websocket: websockets.WebSocketServerProtocol):
         try:
@@ -64,29 +306,80 @@ class RateWebSocketHandler:
                 data = json.loads(message)
                 logger.info(f"Received message: {data.get('event')} for channel: {data.get('channel')}")
 
-                if data.get("event") == "subscribe" and data.get("channel") == "rates":
-                    rates = await self.rate_service.fetch_all_rates()
-                    
-                    response = {
-                        "channel": "rates",
-                        "event": "data",
-                        "data": rates
-                    }
-                    
-                    if not validate_response(response):
+                # INFO: History is always sent as a JSON text frame, whatever the wire format of the client.
+                if data.get("event") == "history" and data.get("channel") == "rates":
+                    try:
+                        response = self.history_response(data)
+                    except ValueError as e:
+                        response = {"channel": "rates", "event": "error", "message": str(e)}
+                    await websocket.send(encode_json(response))
+                    continue
+
+                # INFO: Subscribers are served from the latest snapshot, only the very first ones before the update loop
+                # produced anything trigger a (shared) fetch.
+                # INFO: A resync answers with the full snapshot, clients send it when they detect a sequence gap.
+                # INFO: Clients pick their quote currency on subscribe, CAD when they do not send one.
+                # INFO: The format option overrides the subprotocol, errors are always sent as JSON text frames.
+                if data.get("event") in ("subscribe", "resync") and data.get("channel") == "rates":
+                    if data.get("event") == "subscribe":
+                        currency = normalize_currency(data.get("currency", DEFAULT_QUOTE_CURRENCY))
+                        if currency is None:
+                            error_response = {
+                                "channel": "rates",
+                                "event": "error",
+                                "message": f"Unsupported quote currency, expected one of: {', '.join(QUOTE_CURRENCIES)}"
+                            }
+                            await websocket.send(encode_json(error_response))
+                            continue
+
+                        wire_format = data.get("format", format_for_subprotocol(websocket.subprotocol))
+                        if not isinstance(wire_format, str) or wire_format not in WIRE_FORMATS:
+                            error_response = {
+                                "channel": "rates",
+                                "event": "error",
+                                "message": f"Unsupported format, expected one of: {', '.join(WIRE_FORMATS)}"
+                            }
+                            await websocket.send(encode_json(error_response))
+                            continue
+
+                        symbols = data.get("symbols")
+                        if symbols is not None and not (
+                            isinstance(symbols, list) and all(isinstance(symbol, str) for symbol in symbols)
+                        ):
+                            error_response = {
+                                "channel": "rates",
+                                "event": "error",
+                                "message": "Symbols must be a list of strings"
+                            }
+                            await websocket.send(encode_json(error_response))
+                            continue
+                        self.subscriptions[websocket] = (
+                            currency,
+                            frozenset(symbols) if symbols is not None else None,
+                            wire_format
+                        )
+
+                    currency, symbols, wire_format = self.subscription_for(websocket)
+                    snapshot = await self.snapshot_store.get()
+
+                    if not snapshot or currency not in snapshot.rates:
                         error_response = {
                             "channel": "rates",
                             "event": "error",
-                            "message": "Invalid rate data format"
+                            "message": f"No rates available in {currency} yet"
                         }
-                        await websocket.send(json.dumps(error_response))
+                        await websocket.send(encode_json(error_response))
                         continue
-                    
-                    await websocket.send(json.dumps(response))
+
+                    frame = snapshot.data_frame_for(currency, symbols, wire_format)
+                    await websocket.send(frame)
+                    self._count_frames(wire_format, frame)
                 
         except websockets.exceptions.ConnectionClosed:
             logger.info("Client disconnected")
         except Exception as e:
             logger.error(f"Error handling websocket message: {str(e)}")
         finally:
-            self.connected_clients.remove(websocket)
\ No newline at end of file
+            self.connected_clients.discard(websocket)
+            self.dropped_frames.pop(websocket, None)
+            self.subscriptions.pop(websocket, None)
\ No newline at end of file
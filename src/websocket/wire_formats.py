@@ -0,0 +1,96 @@
+import json
+import struct
+from typing import Any, Callable, Dict, List
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+from src.config.constants import (
+    SUPPORTED_ASSETS, WS_COMPRESSION, WS_DEFLATE_WINDOW_BITS, WS_DEFLATE_MEM_LEVEL, WS_DEFLATE_LEVEL
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# INFO: Encodings of the rate frames. JSON is sent as text frames, the others as binary frames.
+# INFO: The compact layout is fixed-schema and little endian:
+# - header: version (u8), event (u8, 0 = data, 1 = update), seq (u64), number of rates (u16)
+# - one row per rate: asset index in SUPPORTED_ASSETS (u16), ask, bid, spot, change (f64), timestamp (i64, 0 if none),
+#   flags (u8, bit 0 = stale)
+# The quote currency is the one the client subscribed with.
+COMPACT_VERSION = 2
+COMPACT_HEADER = struct.Struct("<BBQH")
+COMPACT_ROW = struct.Struct("<H4dqB")
+COMPACT_STALE = 1
+COMPACT_EVENTS = {"data": 0, "update": 1}
+ASSET_INDEX = {asset: index for index, asset in enumerate(SUPPORTED_ASSETS)}
+
+
+def encode_json(message: Dict[str, Any]) -> str:
+    if orjson:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, separators=(",", ":"))
+
+
+def encode_msgpack(message: Dict[str, Any]) -> bytes:
+    return msgpack.packb(message)
+
+
+def encode_compact(message: Dict[str, Any]) -> bytes:
+    rates: List[Dict[str, Any]] = message["data"]
+    frame = bytearray(COMPACT_HEADER.size + COMPACT_ROW.size * len(rates))
+    COMPACT_HEADER.pack_into(frame, 0, COMPACT_VERSION, COMPACT_EVENTS[message["event"]], message["seq"], len(rates))
+
+    offset = COMPACT_HEADER.size
+    for rate in rates:
+        COMPACT_ROW.pack_into(
+            frame,
+            offset,
+            ASSET_INDEX[rate["symbol"].rpartition("_")[0]],
+            rate["ask"],
+            rate["bid"],
+            rate["spot"],
+            rate["change"],
+            rate.get("timestamp") or 0,
+            COMPACT_STALE if rate.get("stale") else 0
+        )
+        offset += COMPACT_ROW.size
+    return bytes(frame)
+
+
+WIRE_FORMATS: Dict[str, Callable[[Dict[str, Any]], str | bytes]] = {"json": encode_json, "compact": encode_compact}
+if msgpack:
+    WIRE_FORMATS["msgpack"] = encode_msgpack
+
+# INFO: Content types of the formats when a frame is served over plain HTTP.
+CONTENT_TYPES = {"json": "application/json", "msgpack": "application/msgpack", "compact": "application/octet-stream"}
+
+# INFO: Clients can pick the format during the handshake with the "rates.<format>" subprotocol, or with the format
+# option of the subscribe message.
+SUBPROTOCOLS = [f"rates.{wire_format}" for wire_format in WIRE_FORMATS]
+
+
+def format_for_subprotocol(subprotocol: str | None) -> str:
+    if subprotocol and subprotocol.startswith("rates."):
+        wire_format = subprotocol[len("rates."):]
+        if wire_format in WIRE_FORMATS:
+            return wire_format
+    return "json"
+
+
+# INFO: websockets keeps one compressor per connection, so the frames can not be compressed once and shared between
+# clients. The settings trade a bit of ratio for less memory and CPU per client.
+def compression_extensions() -> List[ServerPerMessageDeflateFactory]:
+    if not WS_COMPRESSION:
+        return []
+    return [
+        ServerPerMessageDeflateFactory(
+            server_max_window_bits=WS_DEFLATE_WINDOW_BITS,
+            client_max_window_bits=WS_DEFLATE_WINDOW_BITS,
+            compress_settings={"memLevel": WS_DEFLATE_MEM_LEVEL, "level": WS_DEFLATE_LEVEL}
+        )
+    ]
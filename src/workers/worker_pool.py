@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import struct
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from src.config.constants import WORKER_PIPE_BUFFER_LIMIT
+from src.websocket.rate_snapshot import RateSnapshot
+from src.websocket.wire_formats import encode_json
+
+logger = logging.getLogger(__name__)
+
+# INFO: Each snapshot is sent as one frame, its length (u32, big endian) followed by the JSON message.
+FRAME_HEADER = struct.Struct("!I")
+
+
+def encode_message(snapshot: RateSnapshot) -> bytes:
+    message = {
+        "sequence": snapshot.sequence,
+        "epoch": snapshot.epoch,
+        "timestamp": time.time(),
+        "data": snapshot.rates,
+        "warm": snapshot.warm
+    }
+    payload = encode_json(message).encode()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+# INFO: Worker mode, the process that fetches hands every snapshot to the worker processes serving the clients.
+# INFO: A snapshot is encoded once and the same bytes are written to the pipe of every worker. The pipes are
+# asyncio transports, a worker that does not read is skipped once its buffer is over the limit instead of blocking
+# the fetcher, it catches up with the next snapshot. Workers that die are started again with the latest snapshot.
+# INFO: The workers are spawned, not forked, so they do not inherit the sockets and tasks of the fetcher.
+class WorkerPool:
+    def __init__(
+        self,
+        processes: int,
+        target: Callable[[int, Connection], None],
+        buffer_limit: int = WORKER_PIPE_BUFFER_LIMIT
+    ):
+        self.processes = processes
+        self.target = target
+        self.buffer_limit = buffer_limit
+        self.context = multiprocessing.get_context("spawn")
+        self.workers: List[Tuple[multiprocessing.Process, asyncio.WriteTransport] | None] = [None] * processes
+        self.last_message: bytes | None = None
+        self.supervisor_task: asyncio.Task | None = None
+
+    async def start(self):
+        for index in range(self.processes):
+            await self._start_worker(index)
+        self.supervisor_task = asyncio.create_task(self._supervise())
+
+    async def _start_worker(self, index: int):
+        reader, writer = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=self.target, args=(index, reader), name=f"rates-worker-{index}", daemon=True)
+        process.start()
+        reader.close()
+
+        transport, _ = await asyncio.get_running_loop().connect_write_pipe(asyncio.Protocol, writer)
+        if self.last_message:
+            transport.write(self.last_message)
+        self.workers[index] = (process, transport)
+        logger.info(f"Started worker {index} (pid {process.pid})")
+
+    def publish(self, snapshot: RateSnapshot):
+        message = encode_message(snapshot)
+        self.last_message = message
+        for index, worker in enumerate(self.workers):
+            if worker is None or worker[1].is_closing():
+                continue
+            transport = worker[1]
+            if transport.get_write_buffer_size() > self.buffer_limit:
+                logger.warning(f"Worker {index} is not reading its snapshots, skipping snapshot {snapshot.sequence}")
+                continue
+            transport.write(message)
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(1)
+            for index, worker in enumerate(self.workers):
+                if worker and not worker[0].is_alive():
+                    logger.error(f"Worker {index} exited with code {worker[0].exitcode}, starting it again")
+                    worker[1].close()
+                    try:
+                        await self._start_worker(index)
+                    except Exception as e:
+                        logger.error(f"Error starting worker {index}: {e}")
+
+    # INFO: Runs until the pool is closed.
+    async def wait(self):
+        if self.supervisor_task:
+            await self.supervisor_task
+
+    async def close(self):
+        if self.supervisor_task:
+            self.supervisor_task.cancel()
+            await asyncio.gather(self.supervisor_task, return_exceptions=True)
+        for worker in self.workers:
+            if worker:
+                worker[1].close()
+                worker[0].terminate()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(None, worker[0].join, 5) for worker in self.workers if worker
+        ))
+
+
+# INFO: Worker side of the pipe, the snapshots of the fetcher with the same listen interface as the cluster channel.
+# INFO: stopped is set when the fetcher closes the pipe (it exited) so the worker exits with it.
+class WorkerFeed:
+    def __init__(self, connection: Connection):
+        self.connection = connection
+        self.stopped = asyncio.Event()
+
+    async def listen(self, on_snapshot: Callable[[Dict[str, Any]], Awaitable[None]]):
+        reader = asyncio.StreamReader()
+        await asyncio.get_running_loop().connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader),
+            self.connection
+        )
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                payload = await reader.readexactly(FRAME_HEADER.unpack(header)[0])
+                try:
+                    await on_snapshot(json.loads(payload))
+                except Exception as e:
+                    logger.error(f"Error applying a snapshot from the fetcher: {e}")
+        except asyncio.IncompleteReadError:
+            logger.warning("The fetcher closed the snapshot pipe, stopping the worker")
+            self.stopped.set()
+
+    async def close(self):
+        self.stopped.set()